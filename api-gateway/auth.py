@@ -0,0 +1,160 @@
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import httpx
+from fastapi import Request
+from jose import JWTError, jwk, jwt
+from jose.exceptions import JWKError
+
+# Mismo algoritmo con el que firma el servicio de autenticación (ver su signing.py):
+# con HS256 se usa la clave compartida; con RS256, las claves públicas de su JWKS.
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-for-jwt")
+JWKS_URL = os.getenv("JWKS_URL", "http://auth-service:8001/.well-known/jwks.json")
+# Tiempo que se reutiliza el JWKS y espera mínima entre descargas por un "kid" desconocido.
+JWKS_CACHE_TTL = float(os.getenv("GATEWAY_JWKS_CACHE_TTL", "300"))
+JWKS_MIN_REFRESH_INTERVAL = 30
+# Número máximo de tokens ya verificados que se recuerdan.
+TOKEN_CACHE_SIZE = int(os.getenv("GATEWAY_TOKEN_CACHE_SIZE", "10000"))
+
+# Cabeceras con la identidad verificada que el gateway envía a los servicios: email
+# ("sub"), id del usuario ("uid") y una firma HMAC con GATEWAY_IDENTITY_SECRET que los
+# servicios comprueban (ver common/helpers/identity.py). Cualquier cabecera con este
+# prefijo que envíe el cliente se descarta en todas las rutas (IdentityHeaderFilter).
+IDENTITY_HEADER = "x-authenticated-user"
+IDENTITY_ID_HEADER = "x-authenticated-user-id"
+IDENTITY_SIGNATURE_HEADER = "x-authenticated-user-signature"
+GATEWAY_IDENTITY_SECRET = os.getenv("GATEWAY_IDENTITY_SECRET", "")
+
+
+class Identity(NamedTuple):
+    email: str
+    user_id: Optional[str]
+
+
+def sign_identity(email: str, user_id: str, timestamp: int) -> str:
+    """Misma firma que comprueba common/helpers/identity.py: "<timestamp>.<hmac>"."""
+    message = f"{timestamp}\n{email}\n{user_id}".encode()
+    digest = hmac.new(GATEWAY_IDENTITY_SECRET.encode(), message, hashlib.sha256).hexdigest()
+    return f"{timestamp}.{digest}"
+
+
+def identity_headers(identity: Identity) -> dict:
+    """Cabeceras con la identidad para una petición a un servicio."""
+    user_id = identity.user_id or ""
+    headers = {IDENTITY_HEADER: identity.email}
+    if user_id:
+        headers[IDENTITY_ID_HEADER] = user_id
+    if GATEWAY_IDENTITY_SECRET:
+        headers[IDENTITY_SIGNATURE_HEADER] = sign_identity(identity.email, user_id, int(time.time()))
+    return headers
+
+
+class IdentityHeaderFilter:
+    """
+    Middleware ASGI que elimina de todas las peticiones las cabeceras de identidad
+    que envíe el cliente, antes de que llegue a cualquier ruta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            headers = scope["headers"]
+            if any(name.startswith(IDENTITY_HEADER.encode()) for name, _ in headers):
+                scope = dict(scope)
+                scope["headers"] = [
+                    (name, value) for name, value in headers if not name.startswith(IDENTITY_HEADER.encode())
+                ]
+        await self.app(scope, receive, send)
+
+
+class TokenVerifier:
+    """
+    Verifica los tokens JWT en el propio gateway y recuerda los válidos (LRU acotada)
+    hasta que caducan, para no repetir la comprobación de la firma en cada petición.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, algorithm: str = JWT_ALGORITHM,
+                 jwks_url: str = JWKS_URL):
+        self.max_size = max_size
+        self.algorithm = algorithm
+        self.jwks_url = jwks_url
+        self._verified: "OrderedDict[str, tuple]" = OrderedDict()
+        self._keys = {}
+        self._keys_fetched_at = 0.0
+        self.stats = {"hits": 0, "verified": 0, "invalid": 0, "entries": 0, "jwks_fetches": 0}
+
+    async def refresh_keys(self):
+        """Descarga las claves públicas del servicio de autenticación."""
+        self._keys_fetched_at = time.monotonic()
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.get(self.jwks_url)
+            response.raise_for_status()
+        # Se construye aparte para conservar las claves anteriores si el documento no es válido
+        keys = {
+            key["kid"]: jwk.construct(key, algorithm="RS256")
+            for key in response.json().get("keys", []) if key.get("kid")
+        }
+        self._keys = keys
+        self.stats["jwks_fetches"] += 1
+
+    async def _signing_key(self, token: str):
+        if self.algorithm == "HS256":
+            return SECRET_KEY
+        kid = jwt.get_unverified_header(token).get("kid")
+        age = time.monotonic() - self._keys_fetched_at
+        # Un "kid" desconocido suele indicar que el servicio ha rotado la clave.
+        if age > JWKS_CACHE_TTL or (kid not in self._keys and age > JWKS_MIN_REFRESH_INTERVAL):
+            try:
+                await self.refresh_keys()
+            except (httpx.HTTPError, ValueError, KeyError, TypeError, AttributeError, JWKError) as e:
+                # Respuesta caída, no JSON o con claves mal formadas: se siguen usando las anteriores
+                print(f"No se pudo descargar el JWKS: {e!r}")
+        key = self._keys.get(kid)
+        if key is None:
+            raise JWTError("Clave de firma desconocida")
+        return key
+
+    async def verify(self, token: str) -> Optional[Identity]:
+        """Devuelve la identidad ("sub" y "uid") del token si es válido y no ha caducado; si no, None."""
+        cached = self._verified.get(token)
+        if cached is not None:
+            identity, expires_at = cached
+            if time.time() < expires_at:
+                self._verified.move_to_end(token)
+                self.stats["hits"] += 1
+                return identity
+            del self._verified[token]
+
+        try:
+            key = await self._signing_key(token)
+            payload = jwt.decode(token, key, algorithms=[self.algorithm])
+        except JWTError:
+            self.stats["invalid"] += 1
+            return None
+        if payload.get("sub") is None:
+            self.stats["invalid"] += 1
+            return None
+        identity = Identity(email=payload["sub"], user_id=payload.get("uid"))
+
+        self.stats["verified"] += 1
+        if "exp" not in payload:
+            return identity  # Sin caducidad no se guarda: se vuelve a verificar cada vez.
+        self._verified[token] = (identity, payload["exp"])
+        if len(self._verified) > self.max_size:
+            self._verified.popitem(last=False)
+        self.stats["entries"] = len(self._verified)
+        return identity
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
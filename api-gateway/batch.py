@@ -0,0 +1,134 @@
+import asyncio
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+# Número máximo de sub-peticiones en un mismo lote.
+MAX_BATCH_SIZE = int(os.getenv("GATEWAY_MAX_BATCH_SIZE", "20"))
+
+# Referencia a un valor de una respuesta anterior, p. ej. "{{me.body.id}}".
+REFERENCE = re.compile(r"\{\{\s*([\w-]+)((?:\.[\w-]+)*)\s*\}\}")
+
+
+class SubRequest(BaseModel):
+    id: str
+    service: str
+    method: str = "GET"
+    path: str
+    query: Dict[str, Any] = {}
+    body: Optional[Any] = None
+    # Ids de sub-peticiones que deben terminar antes. Las referencias "{{id...}}" usadas
+    # en path, query o body se añaden automáticamente como dependencias.
+    depends_on: List[str] = []
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest] = Field(..., max_length=MAX_BATCH_SIZE)
+
+
+class SubResponse(BaseModel):
+    id: str
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[SubResponse]
+
+
+class BatchError(ValueError):
+    """El lote no es válido (ids repetidos, dependencias desconocidas o cíclicas)."""
+
+
+def _references(value: Any) -> set:
+    if isinstance(value, str):
+        return {match.group(1) for match in REFERENCE.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*(_references(v) for v in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(_references(v) for v in value)) if value else set()
+    return set()
+
+
+def _lookup(results: dict, request_id: str, attributes: str) -> Any:
+    value: Any = results[request_id].model_dump()
+    for attribute in filter(None, attributes.split(".")):
+        if isinstance(value, list) and attribute.isdigit():
+            value = value[int(attribute)]
+        elif isinstance(value, dict) and attribute in value:
+            value = value[attribute]
+        else:
+            raise KeyError(f"'{request_id}{attributes}' not found")
+    return value
+
+
+def _resolve(value: Any, results: dict) -> Any:
+    """Sustituye las referencias "{{id.body.campo}}" por los valores ya obtenidos."""
+    if isinstance(value, str):
+        whole = REFERENCE.fullmatch(value.strip())
+        if whole:
+            # Una referencia sola conserva el tipo del valor (número, objeto...).
+            return _lookup(results, whole.group(1), whole.group(2))
+        return REFERENCE.sub(lambda m: str(_lookup(results, m.group(1), m.group(2))), value)
+    if isinstance(value, dict):
+        return {k: _resolve(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, results) for v in value]
+    return value
+
+
+def _dependencies(batch: BatchRequest) -> dict:
+    ids = [item.id for item in batch.requests]
+    if len(ids) != len(set(ids)):
+        raise BatchError("Sub-request ids must be unique.")
+    dependencies = {}
+    for item in batch.requests:
+        deps = set(item.depends_on) | _references([item.path, item.query, item.body])
+        unknown = deps - set(ids)
+        if unknown:
+            raise BatchError(f"Sub-request '{item.id}' depends on unknown ids: {sorted(unknown)}")
+        dependencies[item.id] = deps
+    return dependencies
+
+
+async def run_batch(batch: BatchRequest,
+                    execute: Callable[[SubRequest], Awaitable[SubResponse]]) -> BatchResponse:
+    """
+    Ejecuta el lote por etapas: en cada etapa se lanzan a la vez todas las
+    sub-peticiones cuyas dependencias ya terminaron. Si una dependencia falla
+    (estado >= 400), las que dependen de ella responden 424 sin ejecutarse.
+    """
+    dependencies = _dependencies(batch)
+    pending = {item.id: item for item in batch.requests}
+    results: Dict[str, SubResponse] = {}
+
+    while pending:
+        ready = [item for item in pending.values() if dependencies[item.id] <= results.keys()]
+        if not ready:
+            raise BatchError(f"Circular dependencies between sub-requests: {sorted(pending)}")
+
+        to_run = []
+        for item in ready:
+            del pending[item.id]
+            failed = [dep for dep in dependencies[item.id] if results[dep].status >= 400]
+            if failed:
+                results[item.id] = SubResponse(id=item.id, status=424, body={"detail": f"Failed dependencies: {sorted(failed)}"})
+                continue
+            try:
+                resolved = item.model_copy(update={
+                    "path": _resolve(item.path, results),
+                    "query": _resolve(item.query, results),
+                    "body": _resolve(item.body, results),
+                })
+            except (KeyError, IndexError) as e:
+                results[item.id] = SubResponse(id=item.id, status=424, body={"detail": f"Unresolved reference: {e}"})
+                continue
+            to_run.append(resolved)
+
+        for response in await asyncio.gather(*(execute(item) for item in to_run)):
+            results[response.id] = response
+
+    return BatchResponse(responses=[results[item.id] for item in batch.requests])
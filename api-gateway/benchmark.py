@@ -0,0 +1,129 @@
+"""
+Benchmark del reenvío del API Gateway contra un backend simulado local.
+
+Levanta un backend de prueba (responde tras una pequeña espera), el gateway
+actual y una copia del reenvío original basado en `requests`, y mide
+peticiones por segundo y latencias p50/p99 de ambos.
+
+Uso (desde el directorio api-gateway/):
+
+    python benchmark.py --requests 2000 --concurrency 50 --delay-ms 20
+
+Requiere además `requests` instalado para el modo "antes".
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+STUB_PORT = 9100
+GATEWAY_PORT = 9101
+LEGACY_PORT = 9102
+
+
+def build_stub_app(delay: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.get("/courses/")
+    async def list_courses():
+        await asyncio.sleep(delay)
+        return [{"id": i, "title": f"Curso {i}"} for i in range(10)]
+
+    return stub
+
+
+def build_legacy_app(stub_url: str) -> FastAPI:
+    """Reproduce el reenvío bloqueante original (requests dentro de async def)."""
+    import requests
+
+    legacy = FastAPI()
+
+    @legacy.get("/api/v1/{service_name}/{path:path}")
+    async def forward_get(service_name: str, path: str, request: Request):
+        try:
+            response = requests.get(f"{stub_url}/{path}", params=request.query_params)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return legacy
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_load(url: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{STUB_PORT}"
+    os.environ["COURSES_SERVICE_URL"] = stub_url
+    # Se mide solo el reenvío: sin caché ni agrupación de peticiones.
+    os.environ["GATEWAY_ROUTE_POLICIES"] = "{}"
+    import main as gateway  # Se importa después de fijar la URL del backend simulado.
+
+    serve(build_stub_app(args.delay_ms / 1000), STUB_PORT)
+    serve(build_legacy_app(stub_url), LEGACY_PORT)
+    serve(gateway.app, GATEWAY_PORT)
+
+    print(f"{args.requests} peticiones, concurrencia {args.concurrency}, backend {args.delay_ms} ms")
+    print(f"{'modo':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errores':>10}")
+    for label, port in (("antes (requests)", LEGACY_PORT), ("después (httpx pool)", GATEWAY_PORT)):
+        url = f"http://127.0.0.1:{port}/api/v1/courses/courses/"
+        result = asyncio.run(run_load(url, args.requests, args.concurrency))
+        print(f"{label:<22}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p99']:>10.1f}{result['errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
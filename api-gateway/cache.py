@@ -0,0 +1,201 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi.responses import Response
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # La capa compartida en Redis es opcional.
+    aioredis = None
+
+# Memoria máxima de la caché local y tamaño máximo de una respuesta cacheable.
+CACHE_MAX_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("GATEWAY_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+# Tiempo extra que se conserva una entrada caducada para revalidarla con una petición condicional.
+CACHE_STALE_SECONDS = float(os.getenv("GATEWAY_CACHE_STALE_SECONDS", "300"))
+# Si se define, las entradas se comparten entre réplicas del gateway a través de Redis.
+CACHE_REDIS_URL = os.getenv("GATEWAY_CACHE_REDIS_URL")
+
+REDIS_KEY_PREFIX = "gateway:cache:"
+
+# Cabeceras que no se guardan: dependen de la conexión o las recalcula la respuesta.
+# httpx entrega el cuerpo ya descomprimido, por lo que tampoco se conserva Content-Encoding.
+UNCACHED_HEADERS = {
+    "content-length",
+    "content-encoding",
+    "connection",
+    "keep-alive",
+    "transfer-encoding",
+    "date",
+}
+
+
+def make_cache_key(service_name: str, path: str, query_params) -> str:
+    """Clave de caché: servicio, ruta y parámetros de consulta normalizados (ordenados)."""
+    query = urlencode(sorted(query_params.multi_items()))
+    return f"{service_name}:/{path.lstrip('/')}?{query}"
+
+
+def is_cacheable(response) -> bool:
+    cache_control = response.headers.get("cache-control", "").lower()
+    return (
+        response.status_code == 200
+        and "no-store" not in cache_control
+        and "private" not in cache_control
+        and len(response.content) <= CACHE_MAX_ENTRY_BYTES
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110, 13.1.2): el gateway marca como W/ el ETag al comprimir."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strip = lambda tag: tag.strip().removeprefix("W/")
+    return strip(etag) in {strip(tag) for tag in if_none_match.split(",")}
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    headers: dict
+    body: bytes
+    expires_at: float
+    stored_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_upstream(cls, response, ttl: float) -> "CachedResponse":
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name not in UNCACHED_HEADERS
+        }
+        return cls(response.status_code, headers, response.content, time.time() + ttl)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> dict:
+        """Cabeceras para revalidar la entrada con el servicio (respuesta 304 si no cambió)."""
+        headers = {}
+        if self.etag:
+            headers["if-none-match"] = self.etag
+        if self.last_modified:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+    def to_response(self, request_headers=None) -> Response:
+        # Si el cliente ya tiene esta versión, basta con un 304 sin cuerpo.
+        if request_headers and self.etag and etag_matches(request_headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers={"etag": self.etag})
+        return Response(self.body, status_code=self.status_code, headers=self.headers)
+
+    def dumps(self) -> bytes:
+        meta = json.dumps({
+            "status_code": self.status_code,
+            "headers": self.headers,
+            "expires_at": self.expires_at,
+            "stored_at": self.stored_at,
+        }).encode()
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedResponse":
+        meta, _, body = raw.partition(b"\n")
+        return cls(body=body, **json.loads(meta))
+
+
+class ResponseCache:
+    """
+    Caché de respuestas GET: LRU local acotada en bytes, con una capa compartida
+    opcional en Redis. Las entradas caducadas se conservan un tiempo para poder
+    revalidarlas con If-None-Match/If-Modified-Since en lugar de descargarlas de nuevo.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, redis_url: Optional[str] = CACHE_REDIS_URL):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._redis = aioredis.from_url(redis_url) if redis_url and aioredis else None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "redis_hits": 0,
+            "evictions": 0,
+            "entries": 0,
+            "bytes": 0,
+        }
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """Devuelve la entrada (fresca o caducada) o None si no está en ninguna capa."""
+        entry = self._entries.get(key)
+        if entry is not None and time.time() > entry.expires_at + CACHE_STALE_SECONDS:
+            self._size -= self._entries.pop(key).size
+            self._update_size_stats()
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(REDIS_KEY_PREFIX + key)
+            except Exception as e:
+                print(f"Warning: gateway cache could not read from Redis: {e}")
+                raw = None
+            if raw:
+                entry = CachedResponse.loads(raw)
+                self.stats["redis_hits"] += 1
+                self._store_local(key, entry)
+                return entry
+        return None
+
+    async def set(self, key: str, entry: CachedResponse):
+        self._store_local(key, entry)
+        if self._redis is not None:
+            expire = max(1, int(entry.expires_at - time.time() + CACHE_STALE_SECONDS))
+            try:
+                await self._redis.set(REDIS_KEY_PREFIX + key, entry.dumps(), ex=expire)
+            except Exception as e:
+                print(f"Warning: gateway cache could not write to Redis: {e}")
+
+    def _store_local(self, key: str, entry: CachedResponse):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= previous.size
+        if entry.size > self.max_bytes:
+            self._update_size_stats()
+            return
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+            self.stats["evictions"] += 1
+        self._update_size_stats()
+
+    def _update_size_stats(self):
+        self.stats["entries"] = len(self._entries)
+        self.stats["bytes"] = self._size
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Sin brotli instalado solo se ofrece gzip.
+    brotli = None
+
+# Tamaño mínimo (bytes) para comprimir: por debajo no compensa el coste de CPU.
+COMPRESSION_MIN_SIZE = int(os.getenv("GATEWAY_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GATEWAY_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("GATEWAY_BROTLI_QUALITY", "4"))
+# Los fragmentos de este tamaño o mayores se comprimen en un hilo, fuera del event loop.
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("GATEWAY_COMPRESSION_OFFLOAD_SIZE", str(64 * 1024)))
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    return (
+        content_type.startswith(COMPRESSIBLE_TYPES)
+        or content_type.endswith("+json")
+        or content_type.endswith("+xml")
+    )
+
+
+def choose_encoding(accept_encoding: str):
+    """Elige "br" o "gzip" según Accept-Encoding (respetando q=0), o None."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _vary_on_accept_encoding(headers: list) -> list:
+    """
+    Añade Accept-Encoding a la cabecera Vary del servicio (si la trae) en lugar de
+    enviar una segunda; no la toca si ya lo incluye o es "*".
+    """
+    for index, (k, v) in enumerate(headers):
+        if k.lower() == b"vary":
+            values = {part.strip().lower() for part in v.split(b",")}
+            if b"accept-encoding" in values or b"*" in values:
+                return headers
+            merged = v + b", Accept-Encoding" if v.strip() else b"Accept-Encoding"
+            return headers[:index] + [(k, merged)] + headers[index + 1:]
+    return headers + [(b"vary", b"Accept-Encoding")]
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib.
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+
+    async def compress(self, data: bytes, last: bool) -> bytes:
+        def run():
+            out = self._compress(data) if data else b""
+            return out + self._finish() if last else out
+
+        if len(data) >= COMPRESSION_OFFLOAD_SIZE:
+            return await asyncio.to_thread(run)
+        return run()
+
+
+class CompressionMiddleware:
+    """
+    Comprime las respuestas con brotli o gzip según el Accept-Encoding del cliente.
+
+    Solo se comprimen los tipos de contenido compresibles y las respuestas que
+    superan COMPRESSION_MIN_SIZE. Las respuestas que ya traen Content-Encoding
+    (por ejemplo, las que el servicio envió comprimidas) pasan tal cual.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict((k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"])
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(encoding, self.minimum_size, send).run(self.app, scope, receive)
+
+
+class _CompressingResponder:
+    def __init__(self, encoding: str, minimum_size: int, send):
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = send
+        self.start_message = None
+        self.passthrough = False
+        self.buffer = b""
+        self.compressor = None
+
+    async def run(self, app, scope, receive):
+        await app(scope, receive, self.on_send)
+
+    async def on_send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message["headers"]}
+            self.passthrough = (
+                "content-encoding" in headers
+                # Comprimir un rango parcial rompería los offsets de Content-Range
+                or "content-range" in headers
+                or message["status"] in (204, 206, 304)
+                or not is_compressible(headers.get("content-type", ""))
+                or int(headers.get("content-length", self.minimum_size)) < self.minimum_size
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.buffer += body
+            if len(self.buffer) < self.minimum_size and more_body:
+                return
+            if len(self.buffer) < self.minimum_size:
+                # La respuesta completa no llega al mínimo: se envía sin comprimir.
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": self.buffer, "more_body": False})
+                return
+            await self._start_compressing()
+            body, self.buffer = self.buffer, b""
+
+        compressed = await self.compressor.compress(body, last=not more_body)
+        if compressed or not more_body:
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    async def _start_compressing(self):
+        self.compressor = _Compressor(self.encoding)
+        headers = [
+            (k, v) for k, v in self.start_message["headers"]
+            if k.lower() not in (b"content-length", b"etag")
+        ]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        headers = _vary_on_accept_encoding(headers)
+        # El cuerpo ya no es idéntico byte a byte: el ETag pasa a ser débil.
+        for k, v in self.start_message["headers"]:
+            if k.lower() == b"etag":
+                headers.append((b"etag", v if v.startswith(b"W/") else b"W/" + v))
+        await self.send({**self.start_message, "headers": headers})
@@ -0,0 +1,63 @@
+import os
+from collections import deque
+from typing import Optional
+
+# Percentil de la latencia reciente a partir del cual se lanza el segundo intento.
+HEDGE_PERCENTILE = float(os.getenv("GATEWAY_HEDGE_PERCENTILE", "95"))
+# Espera mínima (y la que se usa mientras no hay suficientes muestras), en milisegundos.
+HEDGE_MIN_DELAY_MS = float(os.getenv("GATEWAY_HEDGE_MIN_DELAY_MS", "20"))
+HEDGE_DEFAULT_DELAY_MS = float(os.getenv("GATEWAY_HEDGE_DEFAULT_DELAY_MS", "100"))
+# Carga extra máxima que pueden añadir los segundos intentos, en % de las peticiones.
+HEDGE_BUDGET_PERCENT = float(os.getenv("GATEWAY_HEDGE_BUDGET_PERCENT", "10"))
+
+LATENCY_WINDOW = 500
+MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Latencias recientes de un servicio (ventana deslizante) para calcular percentiles."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if len(self._samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def hedge_delay(self) -> float:
+        """Segundos que se espera al primer intento antes de lanzar el segundo."""
+        observed = self.percentile(HEDGE_PERCENTILE)
+        if observed is None:
+            return HEDGE_DEFAULT_DELAY_MS / 1000
+        return max(HEDGE_MIN_DELAY_MS / 1000, observed)
+
+
+class HedgeBudget:
+    """
+    Limita los segundos intentos a un porcentaje de las peticiones: cada petición
+    aporta una fracción de ficha y cada segundo intento consume una ficha entera.
+    """
+
+    def __init__(self, percent: float = HEDGE_BUDGET_PERCENT, max_tokens: float = 10):
+        self.ratio = percent / 100
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_exhausted": 0}
+
+    def on_request(self):
+        self.stats["requests"] += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.stats["hedged"] += 1
+            return True
+        self.stats["budget_exhausted"] += 1
+        return False
@@ -0,0 +1,56 @@
+import os
+import httpx
+
+# Límites del pool de conexiones keep-alive (se aplican a cada réplica de cada servicio).
+MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GATEWAY_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("GATEWAY_KEEPALIVE_EXPIRY", "30"))
+
+# Tiempos de espera en segundos.
+CONNECT_TIMEOUT = float(os.getenv("GATEWAY_CONNECT_TIMEOUT", "2"))
+READ_TIMEOUT = float(os.getenv("GATEWAY_READ_TIMEOUT", "10"))
+WRITE_TIMEOUT = float(os.getenv("GATEWAY_WRITE_TIMEOUT", "10"))
+POOL_TIMEOUT = float(os.getenv("GATEWAY_POOL_TIMEOUT", "5"))
+
+
+class ServiceClients:
+    """Mantiene un cliente HTTP asíncrono, con su propio pool keep-alive, por réplica."""
+
+    def __init__(self, services: dict):
+        # services: nombre del servicio -> lista de URLs de sus réplicas.
+        self.services = services
+        self._clients: dict = {}
+
+    def _build(self, base_url: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=CONNECT_TIMEOUT,
+                read=READ_TIMEOUT,
+                write=WRITE_TIMEOUT,
+                pool=POOL_TIMEOUT,
+            ),
+        )
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """Devuelve el cliente de la réplica, creándolo la primera vez que se usa."""
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = self._build(base_url)
+            self._clients[base_url] = client
+        return client
+
+    def start(self):
+        for urls in self.services.values():
+            for base_url in urls:
+                self.get(base_url)
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
@@ -1,7 +1,31 @@
-from fastapi import FastAPI, APIRouter, Request, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import requests
+from fastapi.responses import Response
+import asyncio
+import httpx
 import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from auth import IdentityHeaderFilter, TokenVerifier, bearer_token
+from batch import BatchError, BatchRequest, BatchResponse, SubRequest, SubResponse, run_batch
+from compression import CompressionMiddleware
+from cache import CachedResponse, ResponseCache, is_cacheable, make_cache_key
+from hedging import HedgeBudget, LatencyTracker
+from http_client import ServiceClients
+from policies import RoutePolicy, get_route_policy
+from proxy import build_upstream_request, filter_request_headers, streaming_response
+from resilience import (
+    DEADLINE_HEADER,
+    Deadline,
+    DeadlineExceeded,
+    ServiceGuard,
+    ServiceUnavailable,
+    breaker_failure_statuses,
+    retry_after_header,
+)
+from singleflight import SingleFlight
+from upstreams import HealthProber, Upstream, UpstreamGroup, parse_upstreams
 
 # Define la instancia de la aplicación FastAPI.
 app = FastAPI(title="API Gateway Taller Microservicios")
@@ -16,49 +40,300 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip/brotli negociada con Accept-Encoding (ver compression.py).
+app.add_middleware(CompressionMiddleware)
+
+# Descarta en todas las rutas las cabeceras de identidad que envíe el cliente (ver auth.py).
+app.add_middleware(IdentityHeaderFilter)
+
+# Verificación de tokens en el gateway: evita que cada servicio tenga que consultar
+# al servicio de autenticación (y a Mongo) solo para saber quién hace la petición.
+token_verifier = TokenVerifier()
+
+async def authenticate(request: Request):
+    """Guarda en request.state la identidad del token Bearer si es válido."""
+    token = bearer_token(request)
+    request.state.identity = await token_verifier.verify(token) if token else None
+
 # Crea un enrutador para las peticiones de los microservicios.
-router = APIRouter(prefix="/api/v1")
+router = APIRouter(prefix="/api/v1", dependencies=[Depends(authenticate)])
 
-# Define los microservicios y sus URLs.
+# Define los microservicios y las URLs de sus réplicas.
+# Cada variable admite varias URLs separadas por comas, p. ej.
+# COURSES_SERVICE_URL=http://courses-1:8002,http://courses-2:8002
 SERVICES = {
-    "auth": os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001"),
-    "courses": os.getenv("COURSES_SERVICE_URL", "http://service1-service:8002"),
-    "progress": os.getenv("PROGRESS_SERVICE_URL", "http://service2-service:8003"),
-    "evaluations": os.getenv("EVALUATIONS_SERVICE_URL", "http://service3-service:8004")
+    "auth": parse_upstreams(os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001")),
+    "courses": parse_upstreams(os.getenv("COURSES_SERVICE_URL", "http://service1-service:8002")),
+    "progress": parse_upstreams(os.getenv("PROGRESS_SERVICE_URL", "http://service2-service:8003")),
+    "evaluations": parse_upstreams(os.getenv("EVALUATIONS_SERVICE_URL", "http://service3-service:8004"))
 }
 
-# TODO: Implementa una ruta genérica para redirigir peticiones GET.
-@router.get("/{service_name}/{path:path}")
-async def forward_get(service_name: str, path: str, request: Request):
+# Clientes HTTP asíncronos compartidos: un pool de conexiones keep-alive por réplica.
+# Así el reenvío no bloquea el event loop ni abre una conexión TCP nueva en cada petición.
+clients = ServiceClients(SERVICES)
+
+# Balanceo entre réplicas y sondeo activo de su /health para expulsar las caídas.
+upstreams = {service_name: UpstreamGroup(urls) for service_name, urls in SERVICES.items()}
+prober = HealthProber(upstreams, clients)
+
+# Caché de respuestas para las lecturas del catálogo (ver policies.py).
+cache = ResponseCache()
+
+# Límite de concurrencia y circuito independientes por servicio: un servicio colgado
+# no puede acaparar el gateway ni arrastrar a los demás.
+guards = {
+    service_name: ServiceGuard(failure_statuses=breaker_failure_statuses(service_name))
+    for service_name in SERVICES
+}
+
+# Latencias recientes y presupuesto de segundos intentos ("hedging") por servicio.
+latencies = {service_name: LatencyTracker() for service_name in SERVICES}
+hedge_budgets = {service_name: HedgeBudget() for service_name in SERVICES}
+
+# Agrupa los GET idénticos concurrentes en una única llamada al servicio.
+singleflight = SingleFlight()
+
+@app.on_event("startup")
+async def startup_event():
+    clients.start()
+    prober.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await prober.stop()
+    await clients.close()
+    await cache.close()
+
+async def call_upstream(service_name: str, deadline: Deadline,
+                        send: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]],
+                        upstream: Optional[Upstream] = None):
+    """
+    Ejecuta `send` con el cliente de una réplica del servicio (la indicada o la que
+    elija el balanceador), dentro del plazo, el bulkhead y el circuito del servicio.
+    Devuelve la respuesta y la función que hay que llamar cuando se termine de leer
+    el cuerpo.
+    """
+    guard = guards[service_name]
+    upstream = upstream or upstreams[service_name].pick()
+    client = clients.get(upstream.url)
+    upstream.outstanding += 1
+    try:
+        response = await guard.call(deadline, lambda: send(client))
+    except BaseException as e:
+        upstream.outstanding -= 1
+        if isinstance(e, httpx.ConnectError):
+            upstream.mark_down()
+        raise
+
+    def release():
+        upstream.outstanding -= 1
+        guard.release()
+
+    return response, release
+
+async def get_buffered(service_name: str, deadline: Deadline, hedge: bool,
+                       send: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]) -> httpx.Response:
+    """
+    Hace un GET con la respuesta leída entera. Con `hedge`, si el primer intento no
+    ha respondido tras el percentil configurado de la latencia reciente del servicio,
+    se lanza un segundo intento a otra réplica (si el presupuesto lo permite) y se
+    usa la primera respuesta que llegue.
+    """
+    latency = latencies[service_name]
+    budget = hedge_budgets[service_name]
+
+    async def attempt(upstream: Optional[Upstream]) -> httpx.Response:
+        started = time.monotonic()
+        response, release = await call_upstream(service_name, deadline, send, upstream)
+        release()
+        latency.record(time.monotonic() - started)
+        return response
+
+    if not hedge:
+        return await attempt(None)
+
+    budget.on_request()
+    first = upstreams[service_name].pick()
+    primary = asyncio.ensure_future(attempt(first))
+    attempts = {primary}
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=latency.hedge_delay())
+        if done or not budget.try_acquire():
+            return await primary
+        # Otra réplica si la hay; con una sola, una conexión nueva a la misma.
+        second = upstreams[service_name].pick(exclude=[first]) or first
+        attempts.add(asyncio.ensure_future(attempt(second)))
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        budget.stats["hedge_wins"] += 1
+                    return task.result()
+        # Ambos intentos fallaron: se propaga el error del primero.
+        return primary.result()
+    finally:
+        for task in attempts:
+            task.cancel()
+
+async def fetch_upstream(service_name: str, path: str, request: Request, policy: RoutePolicy,
+                         key: str, entry: Optional[CachedResponse], deadline: Deadline) -> CachedResponse:
+    """
+    Obtiene la respuesta del servicio y la guarda en caché si la política lo indica.
+    Si hay una entrada caducada, se revalida con una petición condicional y, ante
+    un 304, se reutiliza el cuerpo guardado.
+    """
+    headers = filter_request_headers(request)
+    # Se pide el cuerpo sin comprimir y los validadores los gestiona el gateway.
+    headers["accept-encoding"] = "identity"
+    headers.pop("if-none-match", None)
+    headers.pop("if-modified-since", None)
+    if entry is not None:
+        headers.update(entry.conditional_headers())
+
+    response = await get_buffered(service_name, deadline, policy.hedge, lambda client: client.get(
+        f"/{path}",
+        params=request.query_params,
+        headers={**headers, DEADLINE_HEADER: deadline.header_value()},
+    ))
+
+    if response.status_code == 304 and entry is not None:
+        cache.stats["revalidated"] += 1
+        entry.expires_at = time.time() + policy.ttl
+        await cache.set(key, entry)
+        return entry
+
+    fetched = CachedResponse.from_upstream(response, policy.ttl)
+    if policy.ttl > 0:
+        cache.stats["misses"] += 1
+        if is_cacheable(response):
+            await cache.set(key, fetched)
+    return fetched
+
+async def buffered_get(service_name: str, path: str, request: Request, policy: RoutePolicy,
+                       deadline: Deadline) -> Response:
+    """
+    Atiende un GET de una ruta con política: primero desde la caché y, si hace falta
+    ir al servicio, agrupando las peticiones idénticas concurrentes en una sola.
+    """
+    key = make_cache_key(service_name, path, request.query_params)
+    entry = None
+    if policy.ttl > 0:
+        entry = await cache.get(key)
+        if entry is not None and entry.is_fresh():
+            cache.stats["hits"] += 1
+            return entry.to_response(request.headers)
+
+    fetch = lambda: fetch_upstream(service_name, path, request, policy, key, entry, deadline)
+    if policy.coalesce:
+        result = await singleflight.do(key, fetch)
+    else:
+        result = await fetch()
+    return result.to_response(request.headers)
+
+async def stream_upstream(service_name: str, path: str, request: Request, deadline: Deadline) -> Response:
+    """Reenvía la petición en modo passthrough (cuerpos en streaming)."""
+    response, release = await call_upstream(service_name, deadline, lambda client: client.send(
+        build_upstream_request(client, f"/{path}", request, {DEADLINE_HEADER: deadline.header_value()}, deadline),
+        stream=True,
+    ))
+    # El hueco del bulkhead se libera cuando termina de enviarse el cuerpo.
+    return streaming_response(response, on_close=release)
+
+def upstream_error(service_name: str, error: Exception) -> HTTPException:
+    """Traduce un fallo al llamar a un servicio en la respuesta de error del gateway."""
+    if isinstance(error, ServiceUnavailable):
+        return HTTPException(status_code=503, detail=f"Service '{service_name}' unavailable: {error}",
+                             headers=retry_after_header(error))
+    if isinstance(error, (DeadlineExceeded, httpx.TimeoutException)):
+        return HTTPException(status_code=504, detail=f"Timeout forwarding request to {service_name}: {error}")
+    return HTTPException(status_code=502, detail=f"Error forwarding request to {service_name}: {error}")
+
+async def proxy(service_name: str, path: str, request: Request):
+    """Reenvía la petición al servicio dentro de su plazo, bulkhead y circuito."""
     if service_name not in SERVICES:
         raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found.")
-    
-    service_url = f"{SERVICES[service_name]}/{path}"
-    
+
+    deadline = Deadline.from_request(request)
+    try:
+        if request.method == "GET":
+            policy = get_route_policy(service_name, path)
+            if policy is not None:
+                return await buffered_get(service_name, path, request, policy, deadline)
+        return await stream_upstream(service_name, path, request, deadline)
+    except (ServiceUnavailable, DeadlineExceeded, httpx.HTTPError) as e:
+        raise upstream_error(service_name, e)
+
+# Cabeceras de la respuesta de cada sub-petición que se incluyen en el lote.
+BATCH_RESPONSE_HEADERS = ("content-type", "etag", "last-modified", "location", "cache-control")
+
+async def execute_subrequest(item: SubRequest, headers: dict, deadline: Deadline) -> SubResponse:
+    if item.service not in SERVICES:
+        return SubResponse(id=item.id, status=404, body={"detail": f"Service '{item.service}' not found."})
     try:
-        response = requests.get(service_url, params=request.query_params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Error forwarding request to {service_name}: {e}")
+        response, release = await call_upstream(item.service, deadline, lambda client: client.request(
+            item.method.upper(),
+            f"/{item.path.lstrip('/')}",
+            params=item.query,
+            json=item.body,
+            headers={**headers, DEADLINE_HEADER: deadline.header_value()},
+        ))
+        release()
+    except (ServiceUnavailable, DeadlineExceeded, httpx.HTTPError) as e:
+        error = upstream_error(item.service, e)
+        return SubResponse(id=item.id, status=error.status_code, body={"detail": error.detail})
+
+    body = response.text or None
+    if "json" in response.headers.get("content-type", ""):
+        try:
+            body = response.json()
+        except ValueError:
+            # Dice ser JSON pero no lo es (p. ej. una página de error de un proxy): se
+            # devuelve como texto y las referencias "{{id.body.campo}}" a ella dan 424.
+            pass
+    return SubResponse(
+        id=item.id,
+        status=response.status_code,
+        headers={name: response.headers[name] for name in BATCH_RESPONSE_HEADERS if name in response.headers},
+        body=body,
+    )
+
+# Ejecuta varias sub-peticiones (de uno o varios servicios) en una sola ida y vuelta.
+# Las independientes se lanzan a la vez; una sub-petición puede usar valores de otra
+# anterior con referencias del tipo "{{me.body.id}}".
+@router.post("/batch", response_model=BatchResponse)
+async def batch(batch_request: BatchRequest, request: Request):
+    headers = filter_request_headers(request)
+    headers.pop("content-length", None)
+    headers.pop("content-type", None)
+    headers["accept-encoding"] = "identity"
+    deadline = Deadline.from_request(request)
+    try:
+        return await run_batch(batch_request, lambda item: execute_subrequest(item, headers, deadline))
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Rutas genéricas de reenvío: una por método HTTP, todas en modo passthrough.
+@router.get("/{service_name}/{path:path}")
+async def forward_get(service_name: str, path: str, request: Request):
+    return await proxy(service_name, path, request)
 
-# TODO: Implementa una ruta genérica para redirigir peticiones POST.
 @router.post("/{service_name}/{path:path}")
 async def forward_post(service_name: str, path: str, request: Request):
-    if service_name not in SERVICES:
-        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found.")
-    
-    service_url = f"{SERVICES[service_name]}/{path}"
-    
-    try:
-        # Pasa los datos JSON del cuerpo de la petición.
-        response = requests.post(service_url, json=await request.json())
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Error forwarding request to {service_name}: {e}")
+    return await proxy(service_name, path, request)
 
-# TODO: Agrega más rutas para otros métodos HTTP (PUT, DELETE, etc.).
+@router.put("/{service_name}/{path:path}")
+async def forward_put(service_name: str, path: str, request: Request):
+    return await proxy(service_name, path, request)
+
+@router.patch("/{service_name}/{path:path}")
+async def forward_patch(service_name: str, path: str, request: Request):
+    return await proxy(service_name, path, request)
+
+@router.delete("/{service_name}/{path:path}")
+async def forward_delete(service_name: str, path: str, request: Request):
+    return await proxy(service_name, path, request)
 
 # Incluye el router en la aplicación principal.
 app.include_router(router)
@@ -66,4 +341,23 @@ app.include_router(router)
 # Endpoint de salud para verificar el estado del gateway.
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "message": "API Gateway is running."}
+    services = {
+        service_name: {**guard.snapshot(), "upstreams": upstreams[service_name].snapshot()}
+        for service_name, guard in guards.items()
+    }
+    degraded = any(service["circuit"]["state"] != "closed" for service in services.values())
+    return {
+        "status": "degraded" if degraded else "ok",
+        "message": "API Gateway is running.",
+        "services": services,
+    }
+
+# Métricas internas del gateway (aciertos y fallos de la caché, etc.).
+@app.get("/metrics")
+def metrics():
+    return {
+        "cache": cache.stats,
+        "coalescing": singleflight.stats,
+        "auth": token_verifier.stats,
+        "hedging": {service_name: budget.stats for service_name, budget in hedge_budgets.items()},
+    }
@@ -0,0 +1,52 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# Políticas por ruta, con la forma "servicio:ruta". En la ruta, "*" equivale a un
+# segmento cualquiera (por ejemplo un id). Se usa la primera que coincida.
+# Solo deben incluirse rutas públicas: la respuesta (en caché o agrupada) se comparte
+# entre clientes. Los GET de rutas sin política se reenvían en streaming sin más.
+DEFAULT_ROUTE_POLICIES = {
+    "courses:courses/": {"ttl": 30},
+    "courses:courses/*": {"ttl": 30},
+    "courses:courses/*/tree": {"ttl": 30},
+    "courses:courses/*/modules/": {"ttl": 60},
+    "courses:modules/*/lessons/": {"ttl": 60},
+}
+
+
+@dataclass
+class RoutePolicy:
+    """Comportamiento del gateway para las peticiones GET de una ruta."""
+    ttl: float = 0  # Segundos que una respuesta se considera fresca en la caché (0 = sin caché).
+    coalesce: bool = True  # Agrupar los GET idénticos concurrentes en una sola llamada.
+    hedge: bool = False  # Lanzar un segundo intento si el primero tarda más de lo habitual.
+
+
+def _load_policies() -> list:
+    raw = os.getenv("GATEWAY_ROUTE_POLICIES")
+    configured = json.loads(raw) if raw else DEFAULT_ROUTE_POLICIES
+    policies = []
+    for pattern, options in configured.items():
+        service_name, _, path = pattern.partition(":")
+        policies.append((service_name, path.strip("/").split("/"), RoutePolicy(**options)))
+    return policies
+
+
+ROUTE_POLICIES = _load_policies()
+
+
+def _matches(pattern_segments: list, path: str) -> bool:
+    segments = path.strip("/").split("/")
+    if len(segments) != len(pattern_segments):
+        return False
+    return all(p == "*" or p == s for p, s in zip(pattern_segments, segments))
+
+
+def get_route_policy(service_name: str, path: str) -> Optional[RoutePolicy]:
+    """Devuelve la política de la ruta, o None si la ruta se reenvía sin más."""
+    for policy_service, pattern_segments, policy in ROUTE_POLICIES:
+        if policy_service == service_name and _matches(pattern_segments, path):
+            return policy
+    return None
@@ -0,0 +1,110 @@
+from typing import Callable
+
+import httpx
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from auth import IDENTITY_HEADER, identity_headers
+from resilience import Deadline
+
+# Cabeceras "hop-by-hop": describen la conexión y no deben reenviarse (RFC 9110, 7.6.1).
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+}
+
+
+def filter_request_headers(request: Request) -> dict:
+    """Cabeceras de la petición del cliente que se reenvían al microservicio."""
+    headers = {
+        name: value
+        for name, value in request.headers.items()
+        if name not in HOP_BY_HOP_HEADERS and name != "host" and not name.startswith(IDENTITY_HEADER)
+    }
+    # Identidad verificada por el gateway (ver auth.py); nunca la que envía el cliente.
+    identity = getattr(request.state, "identity", None)
+    if identity:
+        headers.update(identity_headers(identity))
+    # httpx añade su propio Accept-Encoding si falta; se fija explícitamente para que
+    # el servicio no comprima una respuesta que el cliente no sabe decodificar.
+    headers["accept-encoding"] = request.headers.get("accept-encoding", "identity")
+    if request.client:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        headers["x-forwarded-for"] = (
+            f"{forwarded_for}, {request.client.host}" if forwarded_for else request.client.host
+        )
+    return headers
+
+
+def filter_response_headers(response: httpx.Response) -> dict:
+    """Cabeceras de la respuesta del microservicio que se devuelven al cliente."""
+    return {
+        name: value
+        for name, value in response.headers.items()
+        if name not in HOP_BY_HOP_HEADERS
+    }
+
+
+def has_body(request: Request) -> bool:
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+
+def build_upstream_request(client: httpx.AsyncClient, path: str, request: Request, extra_headers: dict,
+                           deadline: Deadline) -> httpx.Request:
+    """
+    Prepara la petición al servicio en modo "passthrough", sin interpretar el cuerpo.
+
+    El cuerpo se transmite por fragmentos tal y como llega (sin decodificar JSON),
+    de modo que la memoria usada no depende del tamaño del contenido. El plazo de
+    la petición no cuenta el tiempo de la subida (ver Deadline.track_upload).
+    """
+    return client.build_request(
+        request.method,
+        path,
+        params=request.query_params,
+        headers={**filter_request_headers(request), **extra_headers},
+        content=deadline.track_upload(request.stream()) if has_body(request) else None,
+    )
+
+
+def streaming_response(upstream_response: httpx.Response, on_close: Callable[[], None]) -> StreamingResponse:
+    """
+    Devuelve la respuesta del servicio por fragmentos, sin descomprimirla, conservando
+    el código de estado y las cabeceras extremo a extremo (Content-Type, ETag,
+    Content-Encoding...). `on_close` se llama cuando se ha terminado de enviar.
+    """
+    closed = False
+
+    async def close():
+        nonlocal closed
+        if closed:
+            return
+        closed = True
+        try:
+            await upstream_response.aclose()
+        finally:
+            on_close()
+
+    async def body():
+        # El cierre también se hace aquí por si el cliente se desconecta a mitad de la
+        # descarga (en ese caso Starlette no ejecuta la tarea en segundo plano).
+        try:
+            async for chunk in upstream_response.aiter_raw():
+                yield chunk
+        finally:
+            await close()
+
+    return StreamingResponse(
+        body(),
+        status_code=upstream_response.status_code,
+        headers=filter_response_headers(upstream_response),
+        background=BackgroundTask(close),
+    )
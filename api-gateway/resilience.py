@@ -0,0 +1,227 @@
+import asyncio
+import contextlib
+import math
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, FrozenSet, Optional
+
+import httpx
+from fastapi import Request
+
+# Tiempo total (segundos) que el gateway concede a cada petición si el cliente no pide menos.
+REQUEST_DEADLINE = float(os.getenv("GATEWAY_REQUEST_DEADLINE", "15"))
+# Tiempo máximo (segundos) para reenviar el cuerpo de una subida en streaming. Mientras
+# dura la subida no corre el plazo anterior: empieza a contar cuando termina, para la
+# espera de la respuesta. Los bloqueos entre fragmentos los corta GATEWAY_WRITE_TIMEOUT.
+UPLOAD_DEADLINE = float(os.getenv("GATEWAY_UPLOAD_DEADLINE", "3600"))
+# Peticiones simultáneas máximas hacia cada servicio y espera máxima por un hueco libre.
+MAX_CONCURRENCY_PER_SERVICE = int(os.getenv("GATEWAY_MAX_CONCURRENCY_PER_SERVICE", "50"))
+BULKHEAD_QUEUE_TIMEOUT = float(os.getenv("GATEWAY_BULKHEAD_QUEUE_TIMEOUT", "1"))
+# Fallos consecutivos que abren el circuito y segundos que permanece abierto.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("GATEWAY_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("GATEWAY_BREAKER_RESET_TIMEOUT", "30"))
+# Códigos de respuesta que cuentan como fallo del servicio, además de los errores de
+# conexión y los plazos agotados. Un 500 de una petición concreta no indica que el
+# servicio esté caído, así que por defecto solo cuentan los de pasarela/sobrecarga.
+# Se puede cambiar por servicio con GATEWAY_BREAKER_FAILURE_STATUSES_<SERVICIO>.
+BREAKER_FAILURE_STATUSES = os.getenv("GATEWAY_BREAKER_FAILURE_STATUSES", "502,503,504")
+
+# Cabecera con los milisegundos que le quedan a la petición. El gateway la envía a los
+# servicios para que abandonen el trabajo que ya no llegará a tiempo; un cliente también
+# puede enviarla para pedir un plazo menor que el predeterminado.
+DEADLINE_HEADER = "x-request-deadline-ms"
+
+
+class ServiceUnavailable(Exception):
+    """El servicio no acepta más peticiones ahora (circuito abierto o sin capacidad)."""
+
+    def __init__(self, message: str, retry_after: float = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """La petición agotó su plazo antes de obtener respuesta del servicio."""
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        # True mientras se reenvía un cuerpo en streaming (ver track_upload)
+        self.uploading = False
+        self._scope: Optional[asyncio.Timeout] = None
+
+    @classmethod
+    def from_request(cls, request: Request) -> "Deadline":
+        seconds = REQUEST_DEADLINE
+        requested = request.headers.get(DEADLINE_HEADER)
+        if requested and requested.isdigit():
+            seconds = min(seconds, int(requested) / 1000)
+        return cls(seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def header_value(self) -> str:
+        return str(int(self.remaining() * 1000))
+
+    def track_upload(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Envuelve el cuerpo que se reenvía al servicio. Hasta que se termina de enviar
+        rige UPLOAD_DEADLINE; después el plazo de la petición empieza de nuevo.
+        """
+        self.uploading = True
+        # La petición se prepara ya dentro de enforce(): se amplía el plazo en curso
+        self._reschedule()
+
+        async def upload():
+            async for chunk in chunks:
+                yield chunk
+            self.uploading = False
+            self.expires_at = time.monotonic() + self.seconds
+            self._reschedule()
+
+        return upload()
+
+    def _reschedule(self):
+        if self._scope is not None:
+            seconds = UPLOAD_DEADLINE if self.uploading else self.remaining()
+            self._scope.reschedule(asyncio.get_running_loop().time() + seconds)
+
+    @contextlib.asynccontextmanager
+    async def enforce(self):
+        """Aplica el plazo a lo que se ejecute dentro; lanza TimeoutError al agotarse."""
+        async with asyncio.timeout(None) as scope:
+            self._scope = scope
+            self._reschedule()
+            try:
+                yield
+            finally:
+                self._scope = None
+
+
+class CircuitBreaker:
+    """
+    Circuito con tres estados: "closed" (normal), "open" (se rechaza sin llamar al
+    servicio) y "half_open" (pasado el tiempo de espera se deja pasar una sola
+    petición de prueba; si va bien el circuito se cierra, si falla se vuelve a abrir).
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_request(self):
+        if self.state == "open":
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout:
+                raise ServiceUnavailable("circuit breaker is open", retry_after=self.reset_timeout - elapsed)
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                raise ServiceUnavailable("circuit breaker is half-open", retry_after=1)
+            self._probing = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def abandon_request(self):
+        """La petición no llegó a completarse: no cuenta como éxito ni como fallo."""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+def parse_statuses(value: str) -> FrozenSet[int]:
+    return frozenset(int(code) for code in value.replace(" ", "").split(",") if code)
+
+
+def breaker_failure_statuses(service_name: str) -> FrozenSet[int]:
+    """Códigos que abren el circuito de un servicio (ver BREAKER_FAILURE_STATUSES)."""
+    return parse_statuses(
+        os.getenv(f"GATEWAY_BREAKER_FAILURE_STATUSES_{service_name.upper()}", BREAKER_FAILURE_STATUSES)
+    )
+
+
+class ServiceGuard:
+    """Protege las llamadas a un servicio: límite de concurrencia (bulkhead), circuito y plazo."""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY_PER_SERVICE,
+                 failure_statuses: Optional[FrozenSet[int]] = None):
+        self.max_concurrency = max_concurrency
+        self.failure_statuses = (
+            parse_statuses(BREAKER_FAILURE_STATUSES) if failure_statuses is None else failure_statuses
+        )
+        self.breaker = CircuitBreaker()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+    async def call(self, deadline: Deadline, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Ejecuta `send` dentro de los límites del servicio. Si termina bien, el hueco
+        del bulkhead sigue ocupado y el llamador debe liberarlo con `release()` cuando
+        haya terminado de leer la respuesta.
+        """
+        self.breaker.before_request()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), min(BULKHEAD_QUEUE_TIMEOUT, deadline.remaining()))
+        except asyncio.TimeoutError:
+            self.breaker.abandon_request()
+            raise ServiceUnavailable("too many concurrent requests", retry_after=1)
+        self.in_flight += 1
+
+        try:
+            async with deadline.enforce():
+                response = await send()
+        except TimeoutError:
+            self.release()
+            if deadline.uploading:
+                # Subida demasiado lenta por parte del cliente: no es un fallo del servicio
+                self.breaker.abandon_request()
+                raise DeadlineExceeded("upload deadline exceeded sending the request body")
+            self.breaker.record_failure()
+            raise DeadlineExceeded("deadline exceeded waiting for the service")
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            self.release()
+            raise
+        except BaseException:
+            self.breaker.abandon_request()
+            self.release()
+            raise
+
+        if response.status_code in self.failure_statuses:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "circuit": self.breaker.snapshot(),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+def retry_after_header(error: ServiceUnavailable) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
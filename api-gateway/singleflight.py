@@ -0,0 +1,37 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Agrupa las llamadas concurrentes con la misma clave en una sola llamada en curso.
+
+    La primera petición lanza la llamada al servicio; las que llegan mientras sigue
+    en curso esperan ese mismo resultado (o la misma excepción). La llamada se ejecuta
+    en su propia tarea, así que si un cliente cancela su petición el resto de
+    peticiones agrupadas no se ven afectadas.
+    """
+
+    def __init__(self):
+        self._calls: dict = {}
+        self.stats = {"upstream_calls": 0, "collapsed": 0, "in_flight": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.stats["upstream_calls"] += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.stats["collapsed"] += 1
+        self.stats["in_flight"] = len(self._calls)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        self.stats["in_flight"] = len(self._calls)
+        # Marca la excepción como consultada aunque todos los clientes hayan cancelado.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,8 @@
+# Tests del API Gateway, sin servicios reales (se sustituyen por apps ASGI):
+#     pip install pytest && python -m pytest api-gateway/tests
+
+import sys
+from pathlib import Path
+
+# Los módulos del gateway se importan por su nombre (main, resilience, proxy...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
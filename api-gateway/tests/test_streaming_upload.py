@@ -0,0 +1,91 @@
+"""
+El plazo de la petición no debe cortar una subida en streaming lenta: cuenta desde
+que termina de enviarse el cuerpo, para la espera de la respuesta del servicio.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import main
+import resilience
+from resilience import DEADLINE_HEADER
+
+CHUNKS = 6
+CHUNK_DELAY = 0.1  # La subida dura ~0.6 s, el doble del plazo de los tests
+DEADLINE_MS = "300"
+
+
+def fake_service(response_delay: float = 0.0):
+    """Servicio que lee el cuerpo entero y responde con los bytes recibidos."""
+
+    async def app(scope, receive, send):
+        received = 0
+        while True:
+            message = await receive()
+            received += len(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        await asyncio.sleep(response_delay)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"received": %d}' % received})
+
+    return app
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    guard = resilience.ServiceGuard()
+    monkeypatch.setitem(main.guards, "courses", guard)
+
+    def use_service(service_app):
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=service_app), base_url="http://courses")
+        monkeypatch.setattr(main.clients, "get", lambda base_url: client)
+        return guard
+
+    return use_service
+
+
+async def slow_body():
+    for _ in range(CHUNKS):
+        await asyncio.sleep(CHUNK_DELAY)
+        yield b"x" * 1024
+
+
+async def upload() -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://gateway") as client:
+        return await client.post(
+            "/api/v1/courses/content/media",
+            content=slow_body(),
+            headers={DEADLINE_HEADER: DEADLINE_MS, "content-type": "application/octet-stream"},
+        )
+
+
+def test_slow_upload_is_not_cut_by_the_request_deadline(gateway):
+    guard = gateway(fake_service())
+
+    response = asyncio.run(upload())
+
+    assert response.status_code == 200
+    assert response.json() == {"received": CHUNKS * 1024}
+    assert guard.breaker.snapshot() == {"state": "closed", "consecutive_failures": 0}
+
+
+def test_deadline_applies_to_the_response_after_the_upload(gateway):
+    guard = gateway(fake_service(response_delay=0.5))
+
+    response = asyncio.run(upload())
+
+    assert response.status_code == 504
+    assert guard.breaker.failures == 1
+
+
+def test_upload_deadline_is_not_a_service_failure(gateway, monkeypatch):
+    monkeypatch.setattr(resilience, "UPLOAD_DEADLINE", 0.2)
+    guard = gateway(fake_service())
+
+    response = asyncio.run(upload())
+
+    assert response.status_code == 504
+    assert guard.breaker.failures == 0
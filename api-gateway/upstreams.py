@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import os
+from typing import Iterable, Optional
+
+import httpx
+
+# Estrategia de balanceo entre réplicas: "round_robin" o "least_outstanding".
+LB_STRATEGY = os.getenv("GATEWAY_LB_STRATEGY", "least_outstanding")
+# Sondeo activo del /health de cada réplica.
+HEALTH_PROBE_INTERVAL = float(os.getenv("GATEWAY_HEALTH_PROBE_INTERVAL", "5"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("GATEWAY_HEALTH_PROBE_TIMEOUT", "2"))
+# Sondeos fallidos consecutivos para expulsar una réplica y correctos para readmitirla.
+UNHEALTHY_THRESHOLD = int(os.getenv("GATEWAY_UNHEALTHY_THRESHOLD", "2"))
+HEALTHY_THRESHOLD = int(os.getenv("GATEWAY_HEALTHY_THRESHOLD", "1"))
+
+
+def parse_upstreams(value: str) -> list:
+    """Convierte "http://a:8002,http://b:8002" en la lista de URLs de las réplicas."""
+    return [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+
+
+class Upstream:
+    """Una réplica de un servicio."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        self._probe_failures = 0
+        self._probe_successes = 0
+
+    def record_probe(self, ok: bool):
+        if ok:
+            self._probe_failures = 0
+            self._probe_successes += 1
+            if not self.healthy and self._probe_successes >= HEALTHY_THRESHOLD:
+                self.healthy = True
+        else:
+            self._probe_successes = 0
+            self._probe_failures += 1
+            if self._probe_failures >= UNHEALTHY_THRESHOLD:
+                self.healthy = False
+
+    def mark_down(self):
+        """Expulsa la réplica tras un error de conexión; el sondeo la readmitirá."""
+        self.healthy = False
+        self._probe_successes = 0
+
+    def snapshot(self) -> dict:
+        return {"url": self.url, "healthy": self.healthy, "outstanding": self.outstanding}
+
+
+class UpstreamGroup:
+    """Réplicas de un servicio y la estrategia para elegir entre ellas."""
+
+    def __init__(self, urls: Iterable[str], strategy: str = LB_STRATEGY):
+        self.upstreams = [Upstream(url) for url in urls]
+        self.strategy = strategy
+        self._counter = itertools.count()
+
+    def pick(self, exclude: Iterable[Upstream] = ()) -> Optional[Upstream]:
+        """
+        Elige una réplica sana. Si todas están expulsadas se elige entre todas: es
+        preferible intentarlo a rechazar la petición por un sondeo desactualizado.
+        Devuelve None solo si `exclude` deja el grupo vacío.
+        """
+        candidates = [u for u in self.upstreams if u not in exclude]
+        healthy = [u for u in candidates if u.healthy]
+        candidates = healthy or candidates
+        if not candidates:
+            return None
+        start = next(self._counter)
+        rotated = [candidates[(start + i) % len(candidates)] for i in range(len(candidates))]
+        if self.strategy == "least_outstanding":
+            return min(rotated, key=lambda u: u.outstanding)
+        return rotated[0]
+
+    def snapshot(self) -> list:
+        return [upstream.snapshot() for upstream in self.upstreams]
+
+
+class HealthProber:
+    """Tarea en segundo plano que sondea el /health de todas las réplicas."""
+
+    def __init__(self, groups: dict, clients):
+        self.groups = groups
+        self.clients = clients
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self, upstream: Upstream):
+        try:
+            response = await self.clients.get(upstream.url).get("/health", timeout=HEALTH_PROBE_TIMEOUT)
+            upstream.record_probe(response.status_code == 200)
+        except httpx.HTTPError:
+            upstream.record_probe(False)
+
+    async def _run(self):
+        while True:
+            await asyncio.gather(*(
+                self._probe(upstream)
+                for group in self.groups.values()
+                for upstream in group.upstreams
+            ))
+            await asyncio.sleep(HEALTH_PROBE_INTERVAL)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
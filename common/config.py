@@ -16,13 +16,28 @@ class Settings:
     
     # TODO: Agrega las URLs de los microservicios si son necesarias aquí.
     # Por ejemplo, para pruebas o scripts de utilidades.
-    # AUTH_SERVICE_URL: str = os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001")
+    AUTH_SERVICE_URL: str = os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001")
     # CATALOG_SERVICE_URL: str = os.getenv("CATALOG_SERVICE_URL", "http://catalog-service:8002")
 
-    # TODO: Agrega otras configuraciones globales.
-    # Por ejemplo, una clave secreta para la autenticación o el token JWT.
-    # SECRET_KEY: str = os.getenv("SECRET_KEY", "tu-clave-secreta-muy-segura")
-    # ALGORITHM: str = "HS256"
+    # Verificación de tokens JWT (ver common/helpers/token_verifier.py).
+    # Con RS256 los servicios validan con las claves públicas que publica el
+    # servicio de autenticación; con HS256, con la clave compartida.
+    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-jwt")
+    JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
+    JWKS_URL: str = os.getenv("JWKS_URL", "http://auth-service:8001/.well-known/jwks.json")
+    # Clave compartida con el API Gateway para firmar la identidad que envía a los
+    # servicios (ver common/helpers/identity.py). Vacía, no se confía en la cabecera.
+    GATEWAY_IDENTITY_SECRET: str = os.getenv("GATEWAY_IDENTITY_SECRET", "")
+
+    # Pool de conexiones a PostgreSQL de los servicios (ver database_sql.py de
+    # cada servicio). Se aplica tanto al motor síncrono como al asíncrono.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Comprueba la conexión antes de usarla (evita errores tras reinicios de la BD)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Tiempo máximo por sentencia en milisegundos; 0 desactiva el límite
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
 
 # Crea una instancia de la clase de configuración.
 settings = Settings()
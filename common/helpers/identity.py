@@ -0,0 +1,113 @@
+import hashlib
+import hmac
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from jose import JWTError
+
+from common.config import settings
+from common.helpers.token_verifier import TokenVerifier
+
+# Identidad del usuario que el API Gateway envía a los servicios tras verificar el
+# token (ver api-gateway/auth.py). El gateway descarta cualquier valor de estas
+# cabeceras que envíe el cliente y firma las suyas con GATEWAY_IDENTITY_SECRET, de
+# modo que un servicio solo las acepta si la firma es válida: así no basta con
+# llamar al servicio directamente (sin pasar por el gateway) con la cabecera puesta.
+# Sin esas cabeceras (llamadas directas o sin GATEWAY_IDENTITY_SECRET) se verifica el
+# token Bearer en el propio servicio con TokenVerifier.
+IDENTITY_HEADER = "x-authenticated-user"  # email ("sub" del token)
+IDENTITY_ID_HEADER = "x-authenticated-user-id"  # id del usuario ("uid" del token)
+IDENTITY_SIGNATURE_HEADER = "x-authenticated-user-signature"
+# Antigüedad máxima (segundos) de una firma; margen para relojes algo desfasados.
+IDENTITY_MAX_AGE = 60
+
+
+@dataclass
+class Identity:
+    email: str
+    # Solo falta en tokens emitidos antes de que el servicio de autenticación lo incluyera
+    user_id: Optional[str] = None
+
+
+def sign_identity(secret: str, email: str, user_id: str, timestamp: int) -> str:
+    """Firma "<timestamp>.<hmac>" de la identidad, igual que la calcula el gateway."""
+    message = f"{timestamp}\n{email}\n{user_id}".encode()
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f"{timestamp}.{digest}"
+
+
+def verify_identity_signature(secret: str, email: str, user_id: str, signature: str) -> bool:
+    timestamp, _, _ = signature.partition(".")
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > IDENTITY_MAX_AGE:
+        return False
+    return hmac.compare_digest(signature, sign_identity(secret, email, user_id, int(timestamp)))
+
+
+def gateway_identity(request: Request) -> Optional[Identity]:
+    """Identidad enviada por el gateway, o None si falta o la firma no es válida."""
+    email = request.headers.get(IDENTITY_HEADER)
+    signature = request.headers.get(IDENTITY_SIGNATURE_HEADER)
+    if not email or not signature or not settings.GATEWAY_IDENTITY_SECRET:
+        return None
+    user_id = request.headers.get(IDENTITY_ID_HEADER, "")
+    if not verify_identity_signature(settings.GATEWAY_IDENTITY_SECRET, email, user_id, signature):
+        return None
+    return Identity(email=email, user_id=user_id or None)
+
+
+_verifier: Optional[TokenVerifier] = None
+
+
+def token_verifier() -> TokenVerifier:
+    """Verificador compartido por el proceso (guarda en caché las claves del JWKS)."""
+    global _verifier
+    if _verifier is None:
+        _verifier = TokenVerifier(jwks_url=settings.JWKS_URL, algorithm=settings.JWT_ALGORITHM,
+                                  secret_key=settings.SECRET_KEY)
+    return _verifier
+
+
+def token_identity(request: Request) -> Optional[Identity]:
+    """Identidad del token Bearer verificado localmente, o None si falta o no es válido."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        claims = token_verifier().verify(token)
+    except JWTError:
+        return None
+    if not claims.get("sub"):
+        return None
+    return Identity(email=claims["sub"], user_id=claims.get("uid"))
+
+
+def current_identity(request: Request) -> Identity:
+    """
+    Dependencia de FastAPI con el usuario que hace la petición, sin consultar al
+    servicio de autenticación (/users/me/).
+
+    Ejemplo:
+        @app.get("/progress/me/courses/")
+        def my_progress(identity: Identity = Depends(current_identity)): ...
+    """
+    identity = gateway_identity(request) or token_identity(request)
+    if identity is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return identity
+
+
+def current_user_id(identity: Identity = Depends(current_identity)) -> str:
+    """Id del usuario autenticado; 401 si el token no lo incluye (hay que volver a iniciar sesión)."""
+    if identity.user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token without user id, log in again",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return identity.user_id
@@ -0,0 +1,120 @@
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.orm import Query, Session
+
+# Paginación por cursor compartida por los servicios de cursos, progreso y
+# evaluaciones. Los listados la usan solo cuando el cliente la pide (cursor o
+# page=true); sin esos parámetros devuelven la lista de siempre.
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+# Segundos que se reutiliza un total aproximado antes de volver a calcularlo
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 1024
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # Cursor opaco de la página siguiente; None en la última página
+    next_cursor: Optional[str] = None
+    # Número aproximado de filas de todo el listado (en caché, puede ir con retraso)
+    total_estimate: Optional[int] = None
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query: Query, created_col, id_col, cursor: Optional[str], limit: int,
+             descending: bool = False) -> Tuple[list, Optional[str]]:
+    """
+    Paginación por clave sobre (created_at, id): cada página continúa justo después
+    de la última fila de la anterior, así que las páginas profundas cuestan lo mismo
+    que la primera (con un índice sobre ambas columnas) y las filas insertadas entre
+    medias no se repiten ni se saltan. Devuelve (filas, cursor siguiente).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key = tuple_(created_col, id_col)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor))
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col, id_col)
+    # Una fila de más indica si hay página siguiente sin hacer un COUNT
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+
+
+class CountCache:
+    """Totales aproximados por listado, recalculados como mucho cada `ttl` segundos"""
+
+    def __init__(self, ttl: float = COUNT_CACHE_TTL, max_size: int = COUNT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+        value = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+
+count_cache = CountCache()
+
+
+def estimate_table_rows(db: Session, model) -> int:
+    """Filas de una tabla completa; en PostgreSQL la estimación del planificador evita recorrerla"""
+    if db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+            {"table": model.__tablename__},
+        ).scalar()
+        # -1 indica que la tabla nunca se ha analizado
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.query(func.count()).select_from(model).scalar()
+
+
+def estimate_count(db: Session, model, key: str, *filters) -> int:
+    """Total en caché de un listado: la estimación de la tabla sin filtros, COUNT(*) con ellos"""
+    key = f"{model.__tablename__}:{key}"
+    if not filters:
+        return count_cache.get(key, lambda: estimate_table_rows(db, model))
+    return count_cache.get(key, lambda: db.query(func.count()).select_from(model).filter(*filters).scalar())
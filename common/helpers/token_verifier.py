@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Optional
+
+import requests
+from jose import JWTError, jwk, jwt
+from jose.exceptions import JWKError
+
+# Verificador de tokens JWT para los microservicios (cursos, progreso, evaluaciones).
+# Descarga las claves públicas del servicio de autenticación (/.well-known/jwks.json)
+# y valida la firma en el propio proceso, sin llamar al servicio en cada petición.
+
+# Tiempo (segundos) que se reutilizan las claves descargadas antes de volver a pedirlas.
+JWKS_CACHE_TTL = 300
+# Intervalo mínimo entre descargas al recibir un "kid" desconocido (evita que tokens
+# inventados provoquen una descarga por petición).
+JWKS_MIN_REFRESH_INTERVAL = 30
+
+
+class TokenVerifier:
+    """
+    Valida tokens firmados por el servicio de autenticación.
+
+    Con RS256 se usan las claves del JWKS, indexadas por "kid". Cuando llega un
+    token con un "kid" desconocido (el servicio ha rotado la clave) se vuelve a
+    descargar el JWKS. Con HS256 se necesita la clave compartida (secret_key).
+    """
+
+    def __init__(self, jwks_url: Optional[str] = None, algorithm: str = "RS256",
+                 secret_key: Optional[str] = None, cache_ttl: float = JWKS_CACHE_TTL):
+        if algorithm == "RS256" and not jwks_url:
+            raise ValueError("RS256 necesita la URL del JWKS")
+        if algorithm == "HS256" and not secret_key:
+            raise ValueError("HS256 necesita la clave compartida")
+        self.jwks_url = jwks_url
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.cache_ttl = cache_ttl
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Descarga el JWKS. Conviene llamarlo al arrancar el servicio."""
+        response = requests.get(self.jwks_url, timeout=5)
+        response.raise_for_status()
+        # Se construye aparte para conservar las claves anteriores si el documento no es válido
+        keys = {}
+        for key in response.json().get("keys", []):
+            if key.get("kid"):
+                keys[key["kid"]] = jwk.construct(key, algorithm="RS256")
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def _get_key(self, kid: str):
+        age = time.monotonic() - self._fetched_at
+        if age > self.cache_ttl or (kid not in self._keys and age > JWKS_MIN_REFRESH_INTERVAL):
+            try:
+                self.refresh()
+            except (requests.exceptions.RequestException, ValueError, KeyError, TypeError,
+                    AttributeError, JWKError) as e:
+                # Servicio caído, respuesta no JSON o claves mal formadas: se siguen
+                # usando las claves que ya teníamos.
+                print(f"Error al descargar el JWKS: {e}")
+        return self._keys.get(kid)
+
+    def verify(self, token: str) -> dict:
+        """
+        Comprueba la firma y la caducidad del token y devuelve sus claims.
+
+        Raises:
+            jose.JWTError: Si el token no es válido o ha caducado.
+        """
+        if self.algorithm == "HS256":
+            return jwt.decode(token, self.secret_key, algorithms=["HS256"])
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._get_key(kid) if kid else None
+        if key is None:
+            raise JWTError("Clave de firma desconocida")
+        return jwt.decode(token, key, algorithms=["RS256"])
+
+    def identity(self, token: str) -> Optional[str]:
+        """Devuelve el email ("sub") del token, o None si no es válido."""
+        try:
+            return self.verify(token).get("sub")
+        except JWTError:
+            return None
+
+# Se usa en common/helpers/identity.py (dependencia current_identity de los servicios).
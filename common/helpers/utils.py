@@ -1,10 +1,14 @@
 import json
+import threading
+import time
 import requests
-from typing import Any
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
 
 # TODO: Define funciones de ayuda que puedan ser útiles en varios microservicios.
 
-def send_request_to_service(url: str, method: str = "GET", data: Any = None):
+def send_request_to_service(url: str, method: str = "GET", data: Any = None,
+                            headers: Optional[Dict[str, str]] = None):
     """
     Envía una petición HTTP a otro microservicio.
     
@@ -12,6 +16,7 @@ def send_request_to_service(url: str, method: str = "GET", data: Any = None):
         url (str): La URL completa del endpoint.
         method (str): El método HTTP (GET, POST, PUT, DELETE).
         data (Any): Los datos a enviar en el cuerpo de la petición (para POST/PUT).
+        headers (dict): Cabeceras adicionales (p. ej. Authorization).
     
     Returns:
         dict: La respuesta del servicio en formato JSON.
@@ -20,7 +25,7 @@ def send_request_to_service(url: str, method: str = "GET", data: Any = None):
         requests.exceptions.RequestException: Si la petición falla.
     """
     try:
-        response = requests.request(method, url, json=data)
+        response = requests.request(method, url, json=data, headers=headers)
         response.raise_for_status()  # Lanza una excepción si la respuesta es un error
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -32,6 +37,62 @@ def format_date(dt_object: datetime):
     """Formatea un objeto datetime a una cadena de texto."""
     return dt_object.strftime("%Y-%m-%d %H:%M:%S")
 
+# Máximo de ids por llamada a POST /users/batch (USER_BATCH_MAX_IDS en el servicio).
+USER_BATCH_MAX_IDS = 100
+# Segundos que se recuerdan los usuarios resueltos (y los ids que no existen).
+USER_LOOKUP_TTL = 60
+
+_user_cache: Dict[str, tuple] = {}
+_user_cache_lock = threading.Lock()
+
+
+def get_users_by_ids(ids: Iterable[str], auth_service_url: str, token: str) -> Dict[str, Optional[dict]]:
+    """
+    Resuelve ids de usuario (instructor_id, student_id...) a sus datos públicos
+    (id, full_name, user_type) con el menor número de llamadas posible.
+
+    Los ids repetidos se piden una sola vez, los ya resueltos se sirven desde una
+    caché en memoria durante USER_LOOKUP_TTL segundos y el resto se pide en lotes
+    de hasta USER_BATCH_MAX_IDS a POST /users/batch.
+
+    Args:
+        ids: Los ids a resolver; pueden venir repetidos.
+        auth_service_url: La URL base del servicio de autenticación.
+        token: Token de acceso de la petición que se está atendiendo; el servicio
+            de autenticación solo responde a llamadas autenticadas.
+
+    Returns:
+        dict: Cada id con sus datos, o None si el usuario no existe.
+
+    Raises:
+        requests.exceptions.RequestException: Si la petición falla.
+    """
+    now = time.monotonic()
+    result: Dict[str, Optional[dict]] = {}
+    pending = []
+    with _user_cache_lock:
+        for user_id in dict.fromkeys(ids):
+            cached = _user_cache.get(user_id)
+            if cached is not None and cached[0] > now:
+                result[user_id] = cached[1]
+            else:
+                pending.append(user_id)
+
+    for start in range(0, len(pending), USER_BATCH_MAX_IDS):
+        chunk = pending[start:start + USER_BATCH_MAX_IDS]
+        data = send_request_to_service(f"{auth_service_url}/users/batch", "POST", {"ids": chunk},
+                                       headers={"Authorization": f"Bearer {token}"})
+        found = {user["id"]: user for user in data["users"]}
+        expires_at = time.monotonic() + USER_LOOKUP_TTL
+        with _user_cache_lock:
+            for user_id in chunk:
+                result[user_id] = found.get(user_id)
+                _user_cache[user_id] = (expires_at, result[user_id])
+            # Se descartan las entradas caducadas para que la caché no crezca sin límite.
+            for user_id in [k for k, (expires, _) in _user_cache.items() if expires <= now]:
+                del _user_cache[user_id]
+    return result
+
 # TODO: Agrega más funciones de utilidad según sea necesario.
 
 # ------------------------------------------------------------------------------
@@ -48,4 +109,8 @@ def format_date(dt_object: datetime):
 #     print("Usuarios obtenidos:", users)
 # except requests.exceptions.RequestException:
 #     print("No se pudo obtener la lista de usuarios.")
+#
+# Nombres de los instructores de una lista de cursos, en una sola llamada:
+# from common.helpers.utils import get_users_by_ids
+# users = get_users_by_ids([c["instructor_id"] for c in courses], settings.AUTH_SERVICE_URL, token)
 #
\ No newline at end of file
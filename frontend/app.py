@@ -1,5 +1,7 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session
 import os
+import time
+import uuid
 import requests
 from functools import wraps
 
@@ -8,24 +10,88 @@ app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev-secret-key")
 
 API_GATEWAY_URL = os.getenv("API_GATEWAY_URL", "http://localhost:8000")
 
+# Margen (segundos) con el que se renueva el token de acceso antes de que caduque.
+TOKEN_REFRESH_MARGIN = 60
+
+# Última versión del catálogo recibida; mientras no cambie, el servicio responde
+# 304 y se reutiliza la lista guardada aquí.
+_catalog = (None, [])
+
+def device_id():
+    """Identificador estable del navegador: el servicio guarda una sesión por dispositivo."""
+    if "device_id" not in session:
+        session["device_id"] = uuid.uuid4().hex
+    return session["device_id"]
+
+def store_tokens(data):
+    """Guarda en la sesión los tokens devueltos por /token o /token/refresh."""
+    session["token"] = data["access_token"]
+    session["refresh_token"] = data.get("refresh_token")
+    session["token_expires_at"] = time.time() + data.get("expires_in", 0)
+
+def clear_tokens():
+    for key in ("token", "refresh_token", "token_expires_at"):
+        session.pop(key, None)
+
+def refresh_access_token():
+    """Renueva el token de acceso con el refresh token, sin volver a pedir la contraseña."""
+    try:
+        response = requests.post(
+            f"{API_GATEWAY_URL}/api/v1/auth/token/refresh",
+            json={"refresh_token": session["refresh_token"]}
+        )
+    except requests.RequestException:
+        return False
+    if not response.ok:
+        return False
+    store_tokens(response.json())
+    return True
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if "token" not in session:
             return redirect(url_for("login"))
+        if session.get("refresh_token") and time.time() > session.get("token_expires_at", 0) - TOKEN_REFRESH_MARGIN:
+            if not refresh_access_token():
+                clear_tokens()
+                return redirect(url_for("login"))
         return f(*args, **kwargs)
     return decorated_function
 
+def catalog_courses():
+    """Cursos del catálogo, descargados de nuevo solo cuando cambia su versión."""
+    global _catalog
+    etag, courses = _catalog
+    headers = {"If-None-Match": etag} if etag else {}
+    response = requests.get(f"{API_GATEWAY_URL}/api/v1/courses/catalog", headers=headers)
+    if response.status_code == 304:
+        return courses
+    if not response.ok:
+        return []
+    courses = response.json()["courses"]
+    # Se sustituye la tupla completa para que otro hilo nunca vea una mezcla
+    _catalog = (response.headers.get("ETag"), courses)
+    return courses
+
 @app.route("/")
 def index():
     """Homepage with course catalog"""
+    query = request.args.get("q", "").strip()
     try:
-        courses_response = requests.get(f"{API_GATEWAY_URL}/api/v1/courses/courses/")
-        courses = courses_response.json() if courses_response.ok else []
-        return render_template("index.html", title="Plataforma de Cursos Online", courses=courses)
+        if query:
+            # Búsqueda de texto completo, ordenada por relevancia
+            courses_response = requests.get(
+                f"{API_GATEWAY_URL}/api/v1/courses/courses/search", params={"q": query}
+            )
+            # La lista viene paginada: {"items": [...], "next_cursor": ...}
+            courses = courses_response.json()["items"] if courses_response.ok else []
+        else:
+            courses = catalog_courses()
+        return render_template("index.html", title="Plataforma de Cursos Online", courses=courses, query=query)
     except requests.RequestException as e:
         flash(f"Error al cargar los cursos: {str(e)}", "error")
-        return render_template("index.html", title="Plataforma de Cursos Online", courses=[])
+        return render_template("index.html", title="Plataforma de Cursos Online", courses=[], query=query)
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -36,11 +102,11 @@ def login():
                 data={
                     "username": request.form["email"],
                     "password": request.form["password"]
-                }
+                },
+                headers={"X-Device-Id": device_id()}
             )
             if response.ok:
-                data = response.json()
-                session["token"] = data["access_token"]
+                store_tokens(response.json())
                 return redirect(url_for("dashboard"))
             flash("Credenciales inválidas", "error")
         except requests.RequestException:
@@ -75,19 +141,19 @@ def dashboard():
     try:
         headers = {"Authorization": f"Bearer {session['token']}"}
         
-        # Get user info
-        user_response = requests.get(
-            f"{API_GATEWAY_URL}/api/v1/auth/users/me/",
-            headers=headers
-        )
-        user = user_response.json()
-        
-        # Get student's progress
-        progress_response = requests.get(
-            f"{API_GATEWAY_URL}/api/v1/progress/student/{user['id']}/courses/",
-            headers=headers
+        # Get user info and the student's progress in a single gateway round trip;
+        # the progress service identifies the student from the token
+        batch_response = requests.post(
+            f"{API_GATEWAY_URL}/api/v1/batch",
+            headers=headers,
+            json={"requests": [
+                {"id": "user", "service": "auth", "path": "users/me/"},
+                {"id": "progress", "service": "progress", "path": "progress/me/courses/"},
+            ]}
         )
-        progress = progress_response.json() if progress_response.ok else []
+        results = {item["id"]: item for item in batch_response.json()["responses"]}
+        user = results["user"]["body"]
+        progress = results["progress"]["body"] if results["progress"]["status"] == 200 else []
         
         return render_template(
             "dashboard.html",
@@ -106,19 +172,13 @@ def course_detail(course_id):
     try:
         headers = {"Authorization": f"Bearer {session['token']}"}
         
-        # Get course details
+        # Curso con sus módulos y lecciones en una sola petición
         course_response = requests.get(
-            f"{API_GATEWAY_URL}/api/v1/courses/courses/{course_id}",
+            f"{API_GATEWAY_URL}/api/v1/courses/courses/{course_id}/tree",
             headers=headers
         )
         course = course_response.json()
-        
-        # Get modules with lessons
-        modules_response = requests.get(
-            f"{API_GATEWAY_URL}/api/v1/courses/courses/{course_id}/modules/",
-            headers=headers
-        )
-        modules = modules_response.json() if modules_response.ok else []
+        modules = course.get("modules", []) if course_response.ok else []
         
         return render_template(
             "course_detail.html",
@@ -161,13 +221,6 @@ def submit_quiz(quiz_id):
     try:
         headers = {"Authorization": f"Bearer {session['token']}"}
         
-        # Get user info
-        user_response = requests.get(
-            f"{API_GATEWAY_URL}/api/v1/auth/users/me/",
-            headers=headers
-        )
-        user = user_response.json()
-        
         # Submit answers
         answers = {}
         for key, value in request.form.items():
@@ -180,7 +233,6 @@ def submit_quiz(quiz_id):
             headers=headers,
             json={
                 "quiz_id": quiz_id,
-                "student_id": user["id"],
                 "answers": answers
             }
         )
@@ -198,7 +250,15 @@ def submit_quiz(quiz_id):
 
 @app.route("/logout")
 def logout():
-    session.pop("token", None)
+    if session.get("refresh_token"):
+        try:
+            requests.post(
+                f"{API_GATEWAY_URL}/api/v1/auth/token/revoke",
+                json={"refresh_token": session["refresh_token"]}
+            )
+        except requests.RequestException:
+            pass  # La sesión local se cierra igualmente
+    clear_tokens()
     return redirect(url_for("index"))
 
 
@@ -0,0 +1,80 @@
+"""
+Login throughput benchmark for the authentication service.
+
+By default it measures bcrypt verifications per second through the
+PasswordHasher pool (the CPU-bound part of POST /token) with 1, 2, 4...
+workers up to the number of cores, for both thread and process executors:
+
+    python benchmark.py --logins 64
+
+With --url it instead fires concurrent logins at a running service
+(the user must already exist):
+
+    python benchmark.py --url http://localhost:8001 --email a@b.com --password secret --logins 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from hashing import PasswordHasher, pwd_context
+
+
+async def bench_pool(executor: str, workers: int, logins: int, hashed: str) -> float:
+    hasher = PasswordHasher(executor=executor, workers=workers, queue_depth=logins)
+    await hasher.verify("warm-up", hashed)  # Start the workers before measuring
+    started = time.perf_counter()
+    await asyncio.gather(*(hasher.verify("secret", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    return logins / elapsed
+
+
+async def bench_service(url: str, email: str, password: str, logins: int, concurrency: int):
+    import httpx
+
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/token", data={"username": email, "password": password})
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{logins / elapsed:.1f} logins/s, p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f} ms, status codes {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--url")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(bench_service(args.url, args.email, args.password, args.logins, args.concurrency))
+        return
+
+    hashed = pwd_context.hash("secret")
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    print(f"{args.logins} bcrypt verifications, {cores} cores")
+    print(f"{'executor':<10}{'workers':>8}{'logins/s':>12}")
+    for executor in ("thread", "process"):
+        for workers in worker_counts:
+            rate = asyncio.run(bench_pool(executor, workers, args.logins, hashed))
+            print(f"{executor:<10}{workers:>8}{rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
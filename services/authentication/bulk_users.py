@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import IO, AsyncIterator, Iterator, Tuple, Union
+
+from pydantic import ValidationError
+
+try:
+    from models import UserCreate
+    from database import UserStore
+except ImportError:
+    pass
+
+# Rows validated, hashed and inserted together; results are streamed after each batch.
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+# Uploads larger than this are spooled to a temporary file instead of memory.
+BULK_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+# Bytes that are not valid UTF-8 are decoded to this character, and the row is rejected
+REPLACEMENT_CHARACTER = "\ufffd"
+INVALID_ENCODING = "Invalid UTF-8 in row"
+
+
+async def spool_body(chunks: AsyncIterator[bytes]) -> IO[bytes]:
+    """Copy the uploaded body to a spooled file (in memory until BULK_SPOOL_MAX_MEMORY)
+
+    The body is read in full before the response starts, so the per-row results can
+    be streamed back without interleaving reads and writes on the same connection.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_MAX_MEMORY)
+    async for chunk in chunks:
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def iter_rows(body: IO[bytes], fmt: str) -> Iterator[Tuple[int, Union[dict, str]]]:
+    """Yield (row number, fields) for CSV (with a header line) or NDJSON input.
+
+    A row that cannot be parsed, or that is not valid UTF-8, is yielded with an error
+    message instead of fields. Decoding never raises, so one bad byte only rejects its
+    own row rather than aborting the stream halfway through.
+    """
+    text = io.TextIOWrapper(body, encoding="utf-8", errors="replace", newline="")
+    if fmt == "csv":
+        for row_number, fields in enumerate(csv.DictReader(text), start=1):
+            if any(REPLACEMENT_CHARACTER in str(part) for item in fields.items() for part in item):
+                yield row_number, INVALID_ENCODING
+                continue
+            # Empty cells fall back to the model defaults
+            yield row_number, {k: v for k, v in fields.items() if k and v not in ("", None)}
+        return
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        if REPLACEMENT_CHARACTER in line:
+            yield row_number, INVALID_ENCODING
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {e}"
+            continue
+        yield row_number, fields if isinstance(fields, dict) else "Each line must be a JSON object"
+
+
+def _result(row: int, status: str, **extra) -> Tuple[str, bytes]:
+    return status, (json.dumps({"row": row, "status": status, **extra}) + "\n").encode()
+
+
+async def _import_batch(batch: list, seen: set, password_hasher, user_cache, summary: dict) -> AsyncIterator[bytes]:
+    results = {}
+    valid = []
+    for row, fields in batch:
+        if isinstance(fields, str):
+            results[row] = _result(row, "invalid", error=fields)
+            continue
+        try:
+            user = UserCreate(**fields)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            results[row] = _result(row, "invalid", error=f"{field}: {error['msg']}")
+            continue
+        if user.email in seen:
+            results[row] = _result(row, "duplicate", email=user.email)
+            continue
+        seen.add(user.email)
+        valid.append((row, user))
+
+    existing = await UserStore.existing_emails([user.email for _, user in valid]) if valid else set()
+    to_create = []
+    for row, user in valid:
+        if user.email in existing:
+            results[row] = _result(row, "duplicate", email=user.email)
+        else:
+            to_create.append((row, user))
+
+    if to_create:
+        hashes = await password_hasher.hash_many([user.password for _, user in to_create])
+        now = datetime.utcnow()
+        docs = []
+        for (_, user), hashed_password in zip(to_create, hashes):
+            doc = user.dict(exclude={"password"})
+            doc.update(hashed_password=hashed_password, created_at=now, updated_at=now)
+            docs.append(doc)
+        errors = await UserStore.insert_many(docs)
+        created = []
+        for index, ((row, user), doc) in enumerate(zip(to_create, docs)):
+            if index in errors:
+                # Usually a duplicate key: the email was registered after our $in check
+                status = "duplicate" if "E11000" in errors[index] else "error"
+                results[row] = _result(row, status, email=user.email)
+            else:
+                results[row] = _result(row, "created", email=user.email, id=str(doc["_id"]))
+                created.append(user.email)
+        await user_cache.invalidate_many(created)
+
+    for row in sorted(results):
+        status, line = results[row]
+        summary[status] = summary.get(status, 0) + 1
+        yield line
+
+
+async def import_users(rows: Iterator[Tuple[int, Union[dict, str]]], password_hasher, user_cache,
+                       batch_size: int = BULK_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Create users from parsed rows, yielding one NDJSON result line per row and a final summary"""
+    seen = set()
+    summary = {}
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            async for line in _import_batch(batch, seen, password_hasher, user_cache, summary):
+                yield line
+            batch = []
+    if batch:
+        async for line in _import_batch(batch, seen, password_hasher, user_cache, summary):
+            yield line
+    yield (json.dumps({"summary": summary}) + "\n").encode()
@@ -1,21 +1,76 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 import os
-from typing import Optional, Annotated
+from typing import Dict, List, Optional, Set, Annotated
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from pydantic import GetJsonSchemaHandler
 from pydantic_core import core_schema
 
 DATABASE_URL = os.getenv("DATABASE_URL", "mongodb://auth-db:27017")
 
-client = MongoClient(DATABASE_URL)
+# Connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+
+client = AsyncIOMotorClient(
+    DATABASE_URL,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+)
 db = client.auth_db
 
+async def create_indexes():
+    """Create the indexes the service relies on (idempotent)"""
+    await db.users.create_index("email", unique=True)
+
+# Async data access for the users collection
+class UserStore:
+    @staticmethod
+    async def get_by_email(email: str) -> Optional[dict]:
+        """Get a user document by email"""
+        return await db.users.find_one({"email": email})
+
+    @staticmethod
+    async def insert(user_dict: dict) -> dict:
+        """Insert a user and return the stored document, including its _id.
+
+        Raises pymongo.errors.DuplicateKeyError if the email is already registered.
+        """
+        result = await db.users.insert_one(user_dict)
+        return {**user_dict, "_id": result.inserted_id}
+
+    @staticmethod
+    async def get_many(ids: List[ObjectId], fields: List[str]) -> List[dict]:
+        """Get the users with the given ids (one $in query), returning only `fields`"""
+        cursor = db.users.find({"_id": {"$in": ids}}, {field: 1 for field in fields})
+        return await cursor.to_list(length=len(ids))
+
+    @staticmethod
+    async def existing_emails(emails: List[str]) -> Set[str]:
+        """Return which of the given emails are already registered (one $in query)"""
+        cursor = db.users.find({"email": {"$in": emails}}, {"email": 1, "_id": 0})
+        return {doc["email"] async for doc in cursor}
+
+    @staticmethod
+    async def insert_many(user_dicts: List[dict]) -> Dict[int, str]:
+        """Insert users without stopping at the first failure.
+
+        Returns the error message of each failed document, by its position in
+        `user_dicts`; the others were inserted and have their _id set.
+        """
+        try:
+            await db.users.insert_many(user_dicts, ordered=False)
+        except BulkWriteError as e:
+            return {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+        return {}
+
 class PyObjectId(ObjectId):
     @classmethod
     def __get_pydantic_core_schema__(cls, _source_type, _handler):
         return core_schema.no_info_after_validator_function(
             cls.validate,
-            core_schema.str_schema(),
+            # Mongo documents hold ObjectId instances; API payloads hold strings.
+            core_schema.union_schema([core_schema.is_instance_schema(ObjectId), core_schema.str_schema()]),
             serialization=core_schema.plain_serializer_function_ser_schema(
                 lambda instance: str(instance),
                 return_schema=core_schema.str_schema(),
@@ -0,0 +1,87 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from passlib.context import CryptContext
+
+# Worker pool for bcrypt: "thread" (bcrypt releases the GIL) or "process".
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# Hashing jobs allowed to wait for a free worker before new ones are rejected with 503.
+HASH_QUEUE_DEPTH = int(os.getenv("HASH_QUEUE_DEPTH", "64"))
+HASH_RETRY_AFTER_SECONDS = 1
+# Separate process pool for bulk imports, so an import cannot starve interactive logins.
+HASH_BULK_WORKERS = int(os.getenv("HASH_BULK_WORKERS", str(os.cpu_count() or 1)))
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+class HashPoolBusy(Exception):
+    """The hashing queue is full; the client should retry later."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded worker pool so that a burst of logins or sign-ups
+    does not block the event loop. At most `workers + queue_depth` jobs are
+    accepted at once; beyond that HashPoolBusy is raised immediately.
+    """
+
+    def __init__(self, executor: str = HASH_EXECUTOR, workers: int = HASH_WORKERS,
+                 queue_depth: int = HASH_QUEUE_DEPTH, bulk_workers: int = HASH_BULK_WORKERS):
+        self.executor_kind = executor
+        self.workers = workers
+        self.capacity = workers + queue_depth
+        self.pending = 0
+        self.bulk_workers = bulk_workers
+        self._executor: Optional[Executor] = None
+        self._bulk_executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.capacity:
+            raise HashPoolBusy("Password hashing queue is full")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch of passwords in parallel on the bulk process pool"""
+        if self._bulk_executor is None:
+            self._bulk_executor = ProcessPoolExecutor(max_workers=self.bulk_workers)
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *(loop.run_in_executor(self._bulk_executor, _hash, password) for password in passwords)
+        )
+
+    def shutdown(self):
+        for executor in (self._executor, self._bulk_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._bulk_executor = None
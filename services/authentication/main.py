@@ -1,48 +1,91 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
 from typing import Optional
 import os
+import secrets
 import sys
 sys.path.insert(0, '/app')
 
 # Importar modelos y database
 try:
-    from models import UserCreate, User, Token, UserInDB
-    from database import db
+    from models import UserCreate, User, Token, UserInDB, RefreshRequest, SessionInfo
+    from models import UserBatchRequest, UserBatchResponse, UserSummary
+    from database import UserStore, create_indexes
 except ImportError:
     # Fallback si no se pueden importar
     pass
+from bulk_users import import_users, iter_rows, spool_body
+from hashing import HASH_RETRY_AFTER_SECONDS, HashPoolBusy, PasswordHasher
+from sessions import InvalidRefreshToken, SessionStore
+from signing import JWKS_MAX_AGE, KeyRing
+from user_cache import UserCache
 
-# Security configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-for-jwt")
-ALGORITHM = "HS256"
+# Security configuration (signing algorithm and keys: see signing.py)
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+key_ring = KeyRing()
+# Maximum number of ids accepted by POST /users/batch
+USER_BATCH_MAX_IDS = int(os.getenv("USER_BATCH_MAX_IDS", "100"))
+# Refresh tokens and per-device sessions (see sessions.py)
+session_store = SessionStore()
+DEVICE_ID_HEADER = "x-device-id"
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing runs in a bounded worker pool, off the event loop (see hashing.py)
+password_hasher = PasswordHasher()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Users resolved from tokens are cached by email (see user_cache.py)
+user_cache = UserCache()
 
 app = FastAPI()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+@app.on_event("startup")
+async def startup_event():
+    try:
+        await create_indexes()
+        await SessionStore.create_indexes()
+    except Exception as e:
+        # Log and continue so the service doesn't crash immediately if the DB isn't ready.
+        print(f"Warning: could not create DB indexes at startup: {e}")
+    user_cache.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    password_hasher.shutdown()
+    await user_cache.close()
+    await session_store.close()
+
+@app.exception_handler(HashPoolBusy)
+async def hash_pool_busy_handler(request: Request, exc: HashPoolBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+    )
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_user(email: str):
-    user_dict = db.users.find_one({"email": email})
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
+
+def public_user(user: UserInDB) -> User:
+    """Convert a stored user into the API model (string id, no password hash)"""
+    return User(id=str(user.id), **user.dict(exclude={"id", "hashed_password"}))
+
+async def get_user(email: str):
+    user_dict = await UserStore.get_by_email(email)
     if user_dict:
         return UserInDB(**user_dict)
 
-def authenticate_user(email: str, password: str):
-    user = get_user(email)
+async def authenticate_user(email: str, password: str):
+    user = await get_user(email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -53,60 +96,172 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return key_ring.sign(to_encode)
+
+def issue_tokens(user: UserInDB, session_id: str, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # "uid" lets the gateway pass the user id on to the other services, so they do
+    # not need to call /users/me/ to find out who the student is
+    access_token = create_access_token(
+        data={"sub": user.email, "uid": str(user.id), "sid": session_id}, expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds()),
+        "refresh_token": refresh_token,
+    }
 
 @app.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+    # Clients identify the device so a new login replaces that device's session;
+    # without the header each login gets a session of its own.
+    device_id = request.headers.get(DEVICE_ID_HEADER) or secrets.token_hex(8)
+    session_id, refresh_token = await session_store.create(user.email, device_id)
+    return issue_tokens(user, session_id, refresh_token)
+
+@app.post("/token/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshRequest):
+    """Exchange a refresh token for new tokens without checking the password again"""
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    try:
+        session, refresh_token = await session_store.rotate(body.refresh_token)
+    except InvalidRefreshToken:
+        raise invalid
+    user = await user_cache.get(session["user_email"], get_user)
+    if user is None or not user.is_active:
+        raise invalid
+    return issue_tokens(user, session["_id"], refresh_token)
+
+@app.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_refresh_token(body: RefreshRequest):
+    """Log out the device the refresh token belongs to"""
+    try:
+        await session_store.revoke(body.refresh_token)
+    except InvalidRefreshToken:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
 @app.post("/users/", response_model=User)
 async def create_user(user: UserCreate):
-    db_user = get_user(user.email)
+    db_user = await get_user(user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     user_dict = user.dict()
     user_dict["hashed_password"] = hashed_password
     del user_dict["password"]
+    user_dict["created_at"] = user_dict["updated_at"] = datetime.utcnow()
     
-    result = db.users.insert_one(user_dict)
-    created_user = db.users.find_one({"_id": result.inserted_id})
-    return User(**created_user)
+    try:
+        created_user = await UserStore.insert(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    await user_cache.invalidate(user.email)
+    return public_user(UserInDB(**created_user))
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """Claims of a valid, unrevoked access token, without loading the user"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = key_ring.decode(token)
     except JWTError:
-        raise credentials_exception
-    user = get_user(email)
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    if payload.get("sid") and await session_store.is_revoked(payload["sid"]):
+        raise credentials_exception()
+    return payload
+
+async def get_current_user(payload: dict = Depends(get_token_claims)):
+    user = await user_cache.get(payload["sub"], get_user)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
 
 @app.get("/users/me/", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def read_users_me(current_user: UserInDB = Depends(get_current_user)):
+    return public_user(current_user)
+
+@app.post("/users/batch", response_model=UserBatchResponse)
+async def get_users_batch(body: UserBatchRequest, claims: dict = Depends(get_token_claims)):
+    """
+    Resolve many user ids to their public fields in a single query. Needs a valid
+    access token: services forward the token of the request they are serving.
+    Users whose stored document lacks a public field are reported as missing.
+    """
+    ids = list(dict.fromkeys(body.ids))
+    if len(ids) > USER_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {USER_BATCH_MAX_IDS} ids per request")
+    object_ids = [ObjectId(user_id) for user_id in ids if ObjectId.is_valid(user_id)]
+    found = await UserStore.get_many(object_ids, ["full_name", "user_type"]) if object_ids else []
+    users = [
+        UserSummary(id=str(doc["_id"]), full_name=doc["full_name"], user_type=doc["user_type"])
+        for doc in found if doc.get("full_name") is not None and doc.get("user_type") is not None
+    ]
+    found_ids = {user.id for user in users}
+    return UserBatchResponse(users=users, missing=[user_id for user_id in ids if user_id not in found_ids])
+
+@app.post("/users/bulk")
+async def bulk_create_users(request: Request, current_user: UserInDB = Depends(get_current_user)):
+    """
+    Create many users from a CSV (text/csv, with a header line) or NDJSON upload.
+    Each batch is checked for duplicates with one query, hashed on the bulk process
+    pool and inserted unordered; one NDJSON result line per row is streamed back.
+    """
+    if current_user.user_type != "instructor":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only instructors can import users")
+    fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    body = await spool_body(request.stream())
+
+    async def results():
+        try:
+            async for line in import_users(iter_rows(body, fmt), password_hasher, user_cache):
+                yield line
+        finally:
+            body.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/users/me/sessions/", response_model=list[SessionInfo])
+async def read_my_sessions(current_user: UserInDB = Depends(get_current_user)):
+    sessions = await session_store.list_active(current_user.email)
+    return [SessionInfo(id=session["_id"], **session) for session in sessions]
+
+@app.delete("/users/me/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_my_session(session_id: str, current_user: UserInDB = Depends(get_current_user)):
+    if not await session_store.revoke_session(session_id, current_user.email):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+@app.get("/.well-known/jwks.json")
+def jwks(request: Request):
+    """Public signing keys, so other services can verify tokens without calling us"""
+    body = key_ring.jwks()
+    headers = {"ETag": key_ring.jwks_etag, "Cache-Control": f"public, max-age={JWKS_MAX_AGE}"}
+    if request.headers.get("if-none-match") == key_ring.jwks_etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/metrics")
+def metrics():
+    return {"user_cache": user_cache.snapshot()}
 
 @app.get("/health")
 def health_check():
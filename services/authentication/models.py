@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, Annotated
+from typing import List, Optional, Annotated
 from datetime import datetime
 from bson import ObjectId
 from pydantic import GetJsonSchemaHandler
@@ -16,7 +16,7 @@ except ImportError:
         def __get_pydantic_core_schema__(cls, _source_type, _handler):
             return core_schema.no_info_after_validator_function(
                 cls.validate,
-                core_schema.str_schema(),
+                core_schema.union_schema([core_schema.is_instance_schema(ObjectId), core_schema.str_schema()]),
                 serialization=core_schema.plain_serializer_function_ser_schema(
                     lambda instance: str(instance),
                     return_schema=core_schema.str_schema(),
@@ -62,9 +62,34 @@ class User(UserBase):
     class Config:
         orm_mode = True
 
+class UserSummary(BaseModel):
+    """Public fields other services need to display a user"""
+    id: str
+    full_name: str
+    user_type: str
+
+class UserBatchRequest(BaseModel):
+    ids: List[str]
+
+class UserBatchResponse(BaseModel):
+    users: List[UserSummary]
+    missing: List[str]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class SessionInfo(BaseModel):
+    id: str
+    device_id: str
+    created_at: datetime
+    last_used_at: datetime
+    expires_at: datetime
 
 class TokenData(BaseModel):
     email: Optional[str] = None
\ No newline at end of file
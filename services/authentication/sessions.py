@@ -0,0 +1,159 @@
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from pymongo import ReturnDocument
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Without Redis, revocations are only checked in Mongo
+    aioredis = None
+
+try:
+    from database import db
+except ImportError:
+    db = None
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+REVOKED_KEY_PREFIX = "auth:revoked-session:"
+
+
+class InvalidRefreshToken(Exception):
+    """The refresh token is unknown, expired, revoked or was already used."""
+
+
+def _hash_secret(secret: str) -> str:
+    # Refresh secrets are 256-bit random values, so a fast hash is enough:
+    # there is nothing to brute-force the way there is with a password.
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def _split(refresh_token: str) -> Tuple[str, str]:
+    session_id, _, secret = refresh_token.partition(".")
+    if not session_id or not secret:
+        raise InvalidRefreshToken("Malformed refresh token")
+    return session_id, secret
+
+
+class SessionStore:
+    """
+    Per-device login sessions backed by the `sessions` collection.
+
+    A refresh token is "<session id>.<secret>" and only the SHA-256 of the secret
+    is stored. Every refresh rotates the secret; presenting a secret that was
+    already rotated away means the token leaked, so the whole session is revoked.
+    Revoked session ids are also kept in Redis until they would have expired,
+    which lets access tokens carrying the session id be rejected cheaply.
+    """
+
+    def __init__(self, redis_url: Optional[str] = REDIS_URL,
+                 lifetime: timedelta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)):
+        self.lifetime = lifetime
+        self._redis = aioredis.from_url(redis_url) if redis_url and aioredis else None
+
+    @staticmethod
+    async def create_indexes():
+        await db.sessions.create_index("expires_at", expireAfterSeconds=0)
+        await db.sessions.create_index([("user_email", 1), ("device_id", 1)])
+
+    async def create(self, user_email: str, device_id: str) -> Tuple[str, str]:
+        """Start a session for the device, replacing any previous one; returns (session id, refresh token)"""
+        previous = await db.sessions.find_one(
+            {"user_email": user_email, "device_id": device_id, "revoked": False}, {"_id": 1, "expires_at": 1}
+        )
+        if previous:
+            await self._revoke(previous["_id"], previous["expires_at"])
+
+        session_id = secrets.token_urlsafe(16)
+        secret = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        await db.sessions.insert_one({
+            "_id": session_id,
+            "user_email": user_email,
+            "device_id": device_id,
+            "token_hash": _hash_secret(secret),
+            "previous_hash": None,
+            "revoked": False,
+            "created_at": now,
+            "last_used_at": now,
+            "expires_at": now + self.lifetime,
+        })
+        return session_id, f"{session_id}.{secret}"
+
+    async def rotate(self, refresh_token: str) -> Tuple[dict, str]:
+        """Exchange a refresh token for a new one; returns (session, new refresh token)"""
+        session_id, secret = _split(refresh_token)
+        presented = _hash_secret(secret)
+        if await self.is_revoked(session_id):
+            raise InvalidRefreshToken("Session revoked")
+
+        new_secret = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        # Matching on the current hash makes the swap atomic: two concurrent
+        # refreshes with the same token cannot both succeed.
+        session = await db.sessions.find_one_and_update(
+            {"_id": session_id, "token_hash": presented, "revoked": False, "expires_at": {"$gt": now}},
+            {"$set": {"token_hash": _hash_secret(new_secret), "previous_hash": presented, "last_used_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if session is not None:
+            return session, f"{session_id}.{new_secret}"
+
+        stale = await db.sessions.find_one({"_id": session_id})
+        if stale and not stale["revoked"] and stale.get("previous_hash") and hmac.compare_digest(stale["previous_hash"], presented):
+            # An old token was replayed: whoever holds it is not the legitimate client.
+            await self._revoke(session_id, stale["expires_at"])
+            raise InvalidRefreshToken("Refresh token reuse detected, session revoked")
+        raise InvalidRefreshToken("Invalid refresh token")
+
+    async def revoke(self, refresh_token: str):
+        """Revoke the session a refresh token belongs to (logout)"""
+        session_id, secret = _split(refresh_token)
+        session = await db.sessions.find_one({"_id": session_id})
+        if session is None or not hmac.compare_digest(session["token_hash"], _hash_secret(secret)):
+            raise InvalidRefreshToken("Invalid refresh token")
+        await self._revoke(session_id, session["expires_at"])
+
+    async def revoke_session(self, session_id: str, user_email: str) -> bool:
+        """Revoke one of the user's sessions by id; False if it is not theirs"""
+        session = await db.sessions.find_one({"_id": session_id, "user_email": user_email})
+        if session is None:
+            return False
+        await self._revoke(session_id, session["expires_at"])
+        return True
+
+    async def list_active(self, user_email: str) -> list:
+        cursor = db.sessions.find(
+            {"user_email": user_email, "revoked": False, "expires_at": {"$gt": datetime.utcnow()}},
+            {"token_hash": 0, "previous_hash": 0},
+        ).sort("last_used_at", -1)
+        return await cursor.to_list(length=None)
+
+    async def is_revoked(self, session_id: str) -> bool:
+        """Cheap revocation check against Redis; always False without Redis"""
+        if self._redis is None:
+            return False
+        try:
+            return bool(await self._redis.exists(REVOKED_KEY_PREFIX + session_id))
+        except Exception as e:
+            print(f"Warning: could not check session revocation in Redis: {e}")
+            return False
+
+    async def _revoke(self, session_id: str, expires_at: datetime):
+        await db.sessions.update_one({"_id": session_id}, {"$set": {"revoked": True}})
+        if self._redis is not None:
+            ttl = int((expires_at - datetime.utcnow()).total_seconds())
+            if ttl > 0:
+                try:
+                    await self._redis.set(REVOKED_KEY_PREFIX + session_id, 1, ex=ttl)
+                except Exception as e:
+                    print(f"Warning: could not publish session revocation to Redis: {e}")
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwt
+from jose.backends.cryptography_backend import CryptographyRSAKey
+
+# "HS256" signs with the shared SECRET_KEY; "RS256" signs with the private keys in
+# JWT_KEYS_DIR and publishes the public halves at /.well-known/jwks.json.
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-for-jwt")
+# One PEM private key per file; the file name without extension is the key id (kid).
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "/app/keys")
+# Key used to sign new tokens. Defaults to the most recently added key file.
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+# How often the keys directory is checked for rotated keys, in seconds.
+JWT_KEYS_RELOAD_INTERVAL = float(os.getenv("JWT_KEYS_RELOAD_INTERVAL", "30"))
+# Cache-Control max-age of the JWKS document.
+JWKS_MAX_AGE = int(os.getenv("JWKS_MAX_AGE", "300"))
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _public_jwk(kid: str, private_key) -> dict:
+    numbers = private_key.public_key().public_numbers()
+    return {"kty": "RSA", "use": "sig", "alg": "RS256", "kid": kid,
+            "n": _b64url_uint(numbers.n), "e": _b64url_uint(numbers.e)}
+
+
+class KeyRing:
+    """
+    Signing keys of the service. With RS256 every key in JWT_KEYS_DIR is published
+    in the JWKS and accepted for verification, while only the active one signs.
+
+    Rotation: add the new key file (it becomes active unless JWT_ACTIVE_KID says
+    otherwise) and delete the old one once the tokens it signed have expired.
+    The directory is re-read every JWT_KEYS_RELOAD_INTERVAL seconds.
+    """
+
+    def __init__(self, algorithm: str = JWT_ALGORITHM, keys_dir: str = JWT_KEYS_DIR,
+                 active_kid: Optional[str] = JWT_ACTIVE_KID):
+        if algorithm not in ("HS256", "RS256"):
+            raise ValueError(f"Unsupported JWT_ALGORITHM: {algorithm}")
+        self.algorithm = algorithm
+        self.keys_dir = Path(keys_dir)
+        self.configured_kid = active_kid
+        self.active_kid: Optional[str] = None
+        # Keys prepared once per kid: building them from PEM on every call costs
+        # tens of milliseconds of CPU per token
+        self._signing_keys: dict = {}
+        self._verifying_keys: dict = {}
+        self._dir_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.jwks_body = b'{"keys": []}'
+        self.jwks_etag = '"empty"'
+        if algorithm == "RS256":
+            self._load()
+
+    def _load(self):
+        files = sorted(self.keys_dir.glob("*.pem"), key=lambda p: p.stat().st_mtime) if self.keys_dir.is_dir() else []
+        private_keys = {}
+        for path in files:
+            private_keys[path.stem] = serialization.load_pem_private_key(path.read_bytes(), password=None)
+
+        if not private_keys:
+            if self._signing_keys:
+                return  # Keep the current keys rather than signing with nothing
+            # Development only: tokens stop validating when the process restarts and
+            # replicas do not share the key.
+            print(f"Warning: no signing keys in {self.keys_dir}, using an ephemeral RSA key")
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            private_keys[f"ephemeral-{os.urandom(4).hex()}"] = key
+
+        active_kid = self.configured_kid if self.configured_kid in private_keys else list(private_keys)[-1]
+        self._signing_keys = {kid: CryptographyRSAKey(key, "RS256") for kid, key in private_keys.items()}
+        self._verifying_keys = {kid: CryptographyRSAKey(key.public_key(), "RS256") for kid, key in private_keys.items()}
+        self.active_kid = active_kid
+        self.jwks_body = json.dumps(
+            {"keys": [_public_jwk(kid, key) for kid, key in private_keys.items()]}
+        ).encode()
+        self.jwks_etag = '"' + hashlib.sha256(self.jwks_body).hexdigest()[:32] + '"'
+        if self.keys_dir.is_dir():
+            self._dir_mtime = self.keys_dir.stat().st_mtime
+
+    def _maybe_reload(self):
+        if self.algorithm != "RS256":
+            return
+        now = time.monotonic()
+        if now - self._checked_at < JWT_KEYS_RELOAD_INTERVAL:
+            return
+        self._checked_at = now
+        mtime = self.keys_dir.stat().st_mtime if self.keys_dir.is_dir() else None
+        if mtime != self._dir_mtime:
+            self._load()
+
+    def sign(self, claims: dict) -> str:
+        if self.algorithm == "HS256":
+            return jwt.encode(claims, SECRET_KEY, algorithm="HS256")
+        self._maybe_reload()
+        key = self._signing_keys[self.active_kid]
+        return jwt.encode(claims, key, algorithm="RS256", headers={"kid": self.active_kid})
+
+    def decode(self, token: str) -> dict:
+        """Verify the signature and expiry of a token; raises JWTError if invalid"""
+        if self.algorithm == "HS256":
+            return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        self._maybe_reload()
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in self._verifying_keys:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, self._verifying_keys[kid], algorithms=["RS256"])
+
+    def jwks(self) -> bytes:
+        self._maybe_reload()
+        return self.jwks_body
@@ -0,0 +1,9 @@
+# Tests of the authentication service, without Mongo or Redis (the stores are
+# replaced per test):
+#     pip install pytest httpx && python -m pytest services/authentication/tests
+
+import sys
+from pathlib import Path
+
+# The service modules import each other by name
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+import main
+
+# Without `with`, TestClient does not run the startup handlers (Mongo indexes...)
+client = TestClient(main.app)
+
+ANA, LUIS, NO_NAME, NO_TYPE = (str(ObjectId()) for _ in range(4))
+STORED = {
+    ANA: {"full_name": "Ana", "user_type": "student"},
+    LUIS: {"full_name": "Luis", "user_type": "instructor"},
+    NO_NAME: {"user_type": "student"},
+    NO_TYPE: {"full_name": "Sin tipo"},
+}
+
+
+@pytest.fixture(autouse=True)
+def user_store(monkeypatch):
+    async def get_many(ids, fields):
+        return [{"_id": object_id, **STORED[str(object_id)]} for object_id in ids if str(object_id) in STORED]
+
+    monkeypatch.setattr(main.UserStore, "get_many", get_many)
+
+
+def auth_headers() -> dict:
+    token = main.key_ring.sign({"sub": "ana@example.com", "uid": ANA, "exp": int(time.time()) + 60})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_batch_requires_a_valid_token():
+    assert client.post("/users/batch", json={"ids": [ANA]}).status_code == 401
+    assert client.post("/users/batch", json={"ids": [ANA]},
+                       headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+
+
+def test_batch_resolves_ids():
+    response = client.post("/users/batch", json={"ids": [ANA, LUIS, ANA, "bad-id"]}, headers=auth_headers())
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "users": [
+            {"id": ANA, "full_name": "Ana", "user_type": "student"},
+            {"id": LUIS, "full_name": "Luis", "user_type": "instructor"},
+        ],
+        "missing": ["bad-id"],
+    }
+
+
+@pytest.mark.parametrize("user_id", [NO_NAME, NO_TYPE])
+def test_batch_reports_incomplete_users_as_missing(user_id):
+    response = client.post("/users/batch", json={"ids": [ANA, user_id]}, headers=auth_headers())
+
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()["users"]] == [ANA]
+    assert response.json()["missing"] == [user_id]
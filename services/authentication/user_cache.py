@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # The shared Redis tier is optional
+    aioredis = None
+
+try:
+    from models import UserInDB
+except ImportError:
+    UserInDB = None
+
+# Read-through cache of users by email
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Optional Redis shared by all replicas of the service
+REDIS_URL = os.getenv("REDIS_URL")
+
+REDIS_KEY_PREFIX = "auth:user:"
+# Replicas publish invalidated emails here so every local cache drops them
+INVALIDATION_CHANNEL = "auth:user-invalidations"
+
+
+class UserCache:
+    """
+    Two-tier cache of UserInDB keyed by email: a bounded in-process LRU with a
+    TTL, backed by an optional Redis tier. Writes must call `invalidate` so no
+    replica keeps serving the old user.
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE,
+                 redis_url: Optional[str] = REDIS_URL):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._redis = aioredis.from_url(redis_url) if redis_url and aioredis else None
+        self._listener: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0}
+
+    async def get(self, email: str, loader: Callable[[str], Awaitable[Optional["UserInDB"]]]) -> Optional["UserInDB"]:
+        """Return the cached user, or load it with `loader` and cache it"""
+        cached = self._entries.get(email)
+        if cached is not None:
+            expires_at, user = cached
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(email)
+                self.stats["hits"] += 1
+                return user
+            del self._entries[email]
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(REDIS_KEY_PREFIX + email)
+            except Exception as e:
+                print(f"Warning: user cache could not read from Redis: {e}")
+                raw = None
+            if raw:
+                user = UserInDB.model_validate_json(raw)
+                self.stats["redis_hits"] += 1
+                self._store_local(email, user)
+                return user
+
+        self.stats["misses"] += 1
+        user = await loader(email)
+        if user is not None:
+            self._store_local(email, user)
+            if self._redis is not None:
+                try:
+                    await self._redis.set(REDIS_KEY_PREFIX + email, user.model_dump_json(by_alias=True), ex=int(self.ttl))
+                except Exception as e:
+                    print(f"Warning: user cache could not write to Redis: {e}")
+        return user
+
+    async def invalidate(self, email: str):
+        """Drop the user from every tier and from the other replicas' local caches"""
+        self._entries.pop(email, None)
+        self.stats["invalidations"] += 1
+        if self._redis is not None:
+            try:
+                await self._redis.delete(REDIS_KEY_PREFIX + email)
+                await self._redis.publish(INVALIDATION_CHANNEL, email)
+            except Exception as e:
+                print(f"Warning: user cache could not invalidate in Redis: {e}")
+
+    async def invalidate_many(self, emails: List[str]):
+        """Like `invalidate`, with a single Redis round trip for the whole list"""
+        if not emails:
+            return
+        for email in emails:
+            self._entries.pop(email, None)
+        self.stats["invalidations"] += len(emails)
+        if self._redis is not None:
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.delete(*(REDIS_KEY_PREFIX + email for email in emails))
+                    for email in emails:
+                        pipe.publish(INVALIDATION_CHANNEL, email)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Warning: user cache could not invalidate in Redis: {e}")
+
+    def _store_local(self, email: str, user: "UserInDB"):
+        self._entries[email] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(email)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                self._entries.pop(message["data"].decode(), None)
+
+    def start(self):
+        if self._redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["redis_hits"]) / lookups if lookups else 0.0
+        return {**self.stats, "entries": len(self._entries), "hit_rate": round(hit_rate, 4)}
@@ -0,0 +1,105 @@
+"""
+Course import throughput benchmark for the courses service.
+
+Builds one course tree with --modules x --lessons-per-module lessons (10,000 by
+default) and creates it against a running service twice:
+
+- "import": a single POST /courses/import (JSON, or NDJSON with --ndjson)
+- "per-item": one POST /courses/, /modules/ and /lessons/ call per row, the way
+  clients did before. This is slow, so only --per-item-lessons lessons are
+  created and the rate is reported per lesson.
+
+    python benchmark.py --url http://localhost:8002
+    python benchmark.py --url http://localhost:8002 --modules 200 --lessons-per-module 50 --per-item-lessons 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+
+def build_tree(modules: int, lessons_per_module: int) -> dict:
+    return {
+        "title": "Benchmark course",
+        "description": "Generated by benchmark.py",
+        "instructor_id": "benchmark",
+        "modules": [
+            {
+                "title": f"Module {m}",
+                "order": m,
+                "lessons": [
+                    {"title": f"Lesson {m}.{l}", "description": "Lorem ipsum dolor sit amet", "order": l}
+                    for l in range(lessons_per_module)
+                ],
+            }
+            for m in range(modules)
+        ],
+    }
+
+
+async def bench_import(client: httpx.AsyncClient, tree: dict, ndjson: bool) -> float:
+    if ndjson:
+        body, content_type = json.dumps(tree) + "\n", "application/x-ndjson"
+    else:
+        body, content_type = json.dumps(tree), "application/json"
+    started = time.perf_counter()
+    response = await client.post("/courses/import", content=body, headers={"content-type": content_type})
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed
+
+
+async def bench_per_item(client: httpx.AsyncClient, tree: dict, lessons: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(path: str, payload: dict) -> dict:
+        async with semaphore:
+            response = await client.post(path, json=payload)
+            response.raise_for_status()
+            return response.json()
+
+    started = time.perf_counter()
+    fields = {k: v for k, v in tree.items() if k != "modules"}
+    course = await post("/courses/", fields)
+    remaining = lessons
+    for module in tree["modules"]:
+        if remaining <= 0:
+            break
+        created = await post("/modules/", {
+            "title": module["title"], "order": module["order"], "course_id": course["id"],
+        })
+        batch = module["lessons"][:remaining]
+        remaining -= len(batch)
+        await asyncio.gather(*(post("/lessons/", {**lesson, "module_id": created["id"]}) for lesson in batch))
+    return time.perf_counter() - started
+
+
+async def run(args):
+    tree = build_tree(args.modules, args.lessons_per_module)
+    total = args.modules * args.lessons_per_module
+    async with httpx.AsyncClient(base_url=args.url, timeout=600) as client:
+        elapsed = await bench_import(client, tree, args.ndjson)
+        print(f"{'import':<10}{total:>10}{elapsed:>10.2f}{total / elapsed:>14.0f}")
+        lessons = min(args.per_item_lessons, total)
+        if lessons:
+            elapsed = await bench_per_item(client, tree, lessons, args.concurrency)
+            print(f"{'per-item':<10}{lessons:>10}{elapsed:>10.2f}{lessons / elapsed:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8002")
+    parser.add_argument("--modules", type=int, default=100)
+    parser.add_argument("--lessons-per-module", type=int, default=100)
+    parser.add_argument("--per-item-lessons", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--ndjson", action="store_true")
+    args = parser.parse_args()
+    print(f"{'mode':<10}{'lessons':>10}{'seconds':>10}{'lessons/s':>14}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+from redis.exceptions import WatchError
+from sqlalchemy import func, select
+
+import models
+from database_redis import get_async_redis_client
+from database_sql import AsyncSessionLocal
+
+# The catalog (active courses with their module and lesson counts) changes a few
+# times a day but is read on every visit to the home page. It is kept in Redis
+# already serialized, next to a version number that every course, module or
+# lesson write increments. Clients that send the version they have get a 304
+# after a single Redis read.
+VERSION_KEY = "catalog:version"
+SNAPSHOT_KEY = "catalog:snapshot"
+
+redis_client = get_async_redis_client()
+
+
+async def _build(version: int) -> bytes:
+    module_count = (
+        select(func.count(models.ModuleDB.id))
+        .where(models.ModuleDB.course_id == models.CourseDB.id)
+        .scalar_subquery()
+    )
+    lesson_count = (
+        select(func.count(models.LessonDB.id))
+        .join(models.ModuleDB, models.LessonDB.module_id == models.ModuleDB.id)
+        .where(models.ModuleDB.course_id == models.CourseDB.id)
+        .scalar_subquery()
+    )
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(models.CourseDB, module_count, lesson_count)
+            .where(models.CourseDB.is_active.is_(True))
+            .order_by(models.CourseDB.created_at, models.CourseDB.id)
+        )).all()
+    courses = [
+        models.CatalogCourse(
+            module_count=modules,
+            lesson_count=lessons,
+            **models.CourseSummary.model_validate(course, from_attributes=True).dict(),
+        ).model_dump(mode="json")
+        for course, modules, lessons in rows
+    ]
+    return json.dumps({
+        "version": version,
+        "generated_at": datetime.utcnow().isoformat(),
+        "courses": courses,
+    }).encode()
+
+
+class CatalogSnapshot:
+    """
+    Versioned catalog snapshot. Writes call invalidate(), which bumps the version
+    and rebuilds in the background; rebuilds requested while one is running are
+    folded into a single follow-up rebuild.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._dirty = False
+
+    async def start(self):
+        # Seeded with the clock so versions keep increasing if Redis loses its data,
+        # and a client never gets a 304 for a version from before the reset
+        await redis_client.set(VERSION_KEY, int(time.time() * 1000), nx=True)
+        self.schedule_rebuild()
+
+    async def invalidate(self):
+        try:
+            await redis_client.incr(VERSION_KEY)
+        except Exception as e:
+            print(f"Warning: could not bump catalog version: {e}")
+            return
+        self.schedule_rebuild()
+
+    def schedule_rebuild(self):
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._rebuild_loop())
+
+    async def _rebuild_loop(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"Warning: could not rebuild catalog snapshot: {e}")
+
+    async def rebuild(self) -> Tuple[int, bytes]:
+        # The version is read before querying, so the snapshot contains at least
+        # every write that bumped it
+        version = int(await redis_client.get(VERSION_KEY) or 0)
+        body = await _build(version)
+        await self._store(version, body)
+        return version, body
+
+    async def _store(self, version: int, body: bytes):
+        """Replace the snapshot unless a newer one is already stored (by this or another instance)"""
+        async with redis_client.pipeline() as pipe:
+            try:
+                await pipe.watch(SNAPSHOT_KEY)
+                stored = await pipe.hget(SNAPSHOT_KEY, "version")
+                if stored is not None and int(stored) >= version:
+                    return
+                pipe.multi()
+                pipe.hset(SNAPSHOT_KEY, mapping={"version": version, "body": body})
+                await pipe.execute()
+            except WatchError:
+                # Another instance stored its snapshot first; it is at least as new
+                pass
+
+    async def version(self) -> Optional[int]:
+        """Version of the stored snapshot"""
+        try:
+            stored = await redis_client.hget(SNAPSHOT_KEY, "version")
+        except Exception as e:
+            print(f"Warning: could not read catalog version: {e}")
+            return None
+        return int(stored) if stored is not None else None
+
+    async def get(self) -> Tuple[Optional[int], bytes]:
+        """(version, JSON body) of the snapshot, built on the spot if there is none yet"""
+        try:
+            stored = await redis_client.hmget(SNAPSHOT_KEY, "version", "body")
+            if stored[0] is not None:
+                return int(stored[0]), stored[1]
+            return await self.rebuild()
+        except Exception as e:
+            # Without Redis the catalog is still served, just without a version
+            print(f"Warning: could not read catalog snapshot: {e}")
+            return None, await _build(0)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        await redis_client.aclose()
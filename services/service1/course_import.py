@@ -0,0 +1,132 @@
+import json
+import os
+from datetime import datetime
+from typing import List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import models
+from search import rebuild_course_vectors
+
+# Upper bound on the lessons of one import, so a single request cannot hold a
+# transaction (and the whole tree in memory) indefinitely
+COURSE_IMPORT_MAX_LESSONS = int(os.getenv("COURSE_IMPORT_MAX_LESSONS", "50000"))
+# Validation errors reported back; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def parse_courses(body: bytes, ndjson: bool) -> Tuple[List[models.CourseImport], List[dict]]:
+    """
+    Validate every course tree of the body before anything is written: a JSON
+    object or array of objects, or one object per line with NDJSON. Returns the
+    parsed courses and a list of errors located by course number and field path.
+    """
+    errors = []
+    if ndjson:
+        documents = []
+        # Decoded line by line, so invalid UTF-8 is reported with its line number
+        for line_number, raw_line in enumerate(body.splitlines(), start=1):
+            try:
+                line = raw_line.decode("utf-8")
+            except UnicodeDecodeError:
+                errors.append({"course": line_number, "loc": [], "msg": "Invalid UTF-8"})
+                continue
+            if not line.strip():
+                continue
+            try:
+                documents.append((line_number, json.loads(line)))
+            except ValueError as e:
+                errors.append({"course": line_number, "loc": [], "msg": f"Invalid JSON: {e}"})
+    else:
+        try:
+            parsed = json.loads(body)
+        except ValueError as e:
+            return [], [{"course": 1, "loc": [], "msg": f"Invalid JSON: {e}"}]
+        parsed = parsed if isinstance(parsed, list) else [parsed]
+        documents = list(enumerate(parsed, start=1))
+
+    courses = []
+    for course_number, document in documents:
+        try:
+            courses.append(models.CourseImport.model_validate(document))
+        except ValidationError as e:
+            errors.extend(
+                {"course": course_number, "loc": list(error["loc"]), "msg": error["msg"]}
+                for error in e.errors()
+            )
+    if not courses and not errors:
+        errors.append({"course": 0, "loc": [], "msg": "No courses to import"})
+    lessons = sum(len(module.lessons) for course in courses for module in course.modules)
+    if lessons > COURSE_IMPORT_MAX_LESSONS:
+        errors.append({"course": 0, "loc": [], "msg": f"At most {COURSE_IMPORT_MAX_LESSONS} lessons per import"})
+    return courses, errors
+
+
+def lesson_content_ids(courses: List[models.CourseImport]) -> dict:
+    """Referenced content ids with the location of their first use, to report missing ones"""
+    content_ids = {}
+    for course_number, course in enumerate(courses, start=1):
+        for module_index, module in enumerate(course.modules):
+            for lesson_index, lesson in enumerate(module.lessons):
+                if lesson.content_id:
+                    content_ids.setdefault(lesson.content_id, {
+                        "course": course_number,
+                        "loc": ["modules", module_index, "lessons", lesson_index, "content_id"],
+                    })
+    return content_ids
+
+
+def _insert_returning_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    """
+    One multi-row INSERT ... RETURNING id per batch of rows (SQLAlchemy splits large
+    lists into batches); the ids come back in the order of `rows`.
+    """
+    if not rows:
+        return []
+    return db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows).scalars().all()
+
+
+def import_courses(db: Session, courses: List[models.CourseImport]) -> models.CourseImportResponse:
+    """
+    Insert the courses, then all their modules, then all their lessons, with one
+    batched statement per level, and fill in the search vectors of the new courses
+    with a single UPDATE. Everything is committed (or rolled back) together.
+    """
+    now = datetime.utcnow()
+    stamps = {"created_at": now, "updated_at": now}
+    try:
+        course_ids = _insert_returning_ids(db, models.CourseDB, [
+            {**course.dict(exclude={"modules"}), "is_active": True, **stamps} for course in courses
+        ])
+        module_rows = [
+            {**module.dict(exclude={"lessons"}), "course_id": course_id, **stamps}
+            for course, course_id in zip(courses, course_ids)
+            for module in course.modules
+        ]
+        module_ids = _insert_returning_ids(db, models.ModuleDB, module_rows)
+        modules = [module for course in courses for module in course.modules]
+        lesson_ids = _insert_returning_ids(db, models.LessonDB, [
+            {**lesson.dict(), "module_id": module_id, **stamps}
+            for module, module_id in zip(modules, module_ids)
+            for lesson in module.lessons
+        ])
+        rebuild_course_vectors(db, models.CourseDB.id.in_(course_ids))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Hand the flat id lists back out following the shape of the input tree
+    lesson_iter, module_iter = iter(lesson_ids), iter(zip(modules, module_ids))
+    results = []
+    for course, course_id in zip(courses, course_ids):
+        course_modules = []
+        for _ in course.modules:
+            module, module_id = next(module_iter)
+            course_modules.append(models.ModuleImportResult(
+                id=module_id, lesson_ids=[next(lesson_iter) for _ in module.lessons]
+            ))
+        results.append(models.CourseImportResult(id=course_id, modules=course_modules))
+    return models.CourseImportResponse(courses=results, modules=len(module_ids), lessons=len(lesson_ids))
@@ -1,4 +1,5 @@
 import redis
+import redis.asyncio as aioredis
 import os
 
 # Obtén la URL de la base de datos de las variables de entorno
@@ -8,7 +9,15 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://redis-db:6379/0")
 def get_redis_client():
     return redis.from_url(REDIS_URL)
 
+# Cliente asíncrono para usar desde los endpoints async sin bloquear el event loop
+def get_async_redis_client():
+    return aioredis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+
 # Ejemplo de uso:
 # redis_client = get_redis_client()
 # redis_client.set("my_key", "my_value")
 # value = redis_client.get("my_key")
+#
+# En código async:
+# redis_client = get_async_redis_client()
+# await redis_client.set("my_key", "my_value")
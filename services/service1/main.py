@@ -1,23 +1,49 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import BackgroundTasks, FastAPI, Depends, File, Form, HTTPException, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 import sys
 sys.path.insert(0, '/app')
 
 import models
-from database_sql import get_db, create_db_and_tables
+from database_sql import SessionLocal, async_engine, get_async_db, get_db, create_db_and_tables
+from catalog import CatalogSnapshot
+from course_import import MAX_REPORTED_ERRORS, import_courses, lesson_content_ids, parse_courses
 from database_mongo import ContentStore
+from media_store import MediaStore, RangeNotSatisfiable
+from common.helpers.pagination import DEFAULT_PAGE_SIZE, Page, estimate_count, paginate
+from search import (
+    LESSON_TEXT, MODULE_TEXT, append_to_course, course_vector, ensure_search_index, search_courses, uses_tsvector,
+)
 
 app = FastAPI(title="Courses Service")
+media_store = MediaStore()
+# Pre-serialized course catalog in Redis, versioned (see catalog.py)
+catalog = CatalogSnapshot()
 
 # Create tables on startup
 @app.on_event("startup")
 async def startup_event():
     try:
         create_db_and_tables()
+        with SessionLocal() as db:
+            ensure_search_index(db)
     except Exception as e:
         # Log and continue so the service doesn't crash immediately if the DB isn't ready.
         print(f"Warning: could not create DB tables at startup: {e}")
+    try:
+        await catalog.start()
+    except Exception as e:
+        print(f"Warning: could not build the catalog snapshot at startup: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ContentStore.close()
+    await catalog.close()
+    await async_engine.dispose()
 
 @app.get("/health")
 def health_check():
@@ -26,68 +52,245 @@ def health_check():
 
 # Course endpoints
 @app.post("/courses/", response_model=models.Course)
-def create_course(course: models.CourseCreate, db: Session = Depends(get_db)):
-    db_course = models.Course(**course.dict())
+def create_course(course: models.CourseCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    db_course = models.CourseDB(**course.dict())
+    if uses_tsvector(db):
+        db_course.search_vector = course_vector(course.title, course.description)
     db.add(db_course)
     db.commit()
     db.refresh(db_course)
+    background_tasks.add_task(catalog.invalidate)
     return db_course
 
-@app.get("/courses/", response_model=List[models.Course])
-def list_courses(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    courses = db.query(models.Course).offset(skip).limit(limit).all()
-    return courses
+@app.post("/courses/import", response_model=models.CourseImportResponse)
+async def import_course_trees(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    Create complete courses (modules and lessons included) from a JSON object or
+    array, or NDJSON (application/x-ndjson) with one course per line. The whole
+    input is validated first; on any error nothing is written and 422 lists the
+    errors. Otherwise all rows are inserted in one transaction and the new ids
+    are returned in the same shape as the input.
+    """
+    body = await request.body()
+    courses, errors = parse_courses(body, "ndjson" in request.headers.get("content-type", ""))
+    if not errors:
+        content_ids = lesson_content_ids(courses)
+        if content_ids:
+            for content_id in await ContentStore.missing_ids(content_ids):
+                errors.append({**content_ids[content_id], "msg": f"Content {content_id} not found"})
+    if errors:
+        raise HTTPException(status_code=422, detail={"errors": errors[:MAX_REPORTED_ERRORS], "error_count": len(errors)})
+    # The inserts are synchronous; keep them off the event loop
+    result = await run_in_threadpool(import_courses, db, courses)
+    background_tasks.add_task(catalog.invalidate)
+    return result
 
-@app.get("/courses/{course_id}", response_model=models.Course)
-def get_course(course_id: int, db: Session = Depends(get_db)):
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+# Loads modules and lessons with one extra query per level (SELECT ... WHERE id IN ...)
+# instead of one query per course and per module when the response is serialized.
+COURSE_TREE = selectinload(models.CourseDB.modules).selectinload(models.ModuleDB.lessons)
+
+@app.get("/courses/", response_model=None)
+def list_courses(skip: int = 0, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                 page: bool = False, tree: bool = False, db: Session = Depends(get_db)):
+    """
+    List courses with their modules and lessons, `limit` courses from `skip`.
+
+    Passing a cursor or page=true returns a Page instead, oldest first: pass the
+    returned next_cursor to get the following page. Paged items only have the
+    course fields unless tree=true.
+    """
+    if cursor is None and not page:
+        courses = db.query(models.CourseDB).options(COURSE_TREE).offset(skip).limit(limit).all()
+        return [models.Course.model_validate(course, from_attributes=True) for course in courses]
+    query = db.query(models.CourseDB)
+    if tree:
+        query = query.options(COURSE_TREE)
+    courses, next_cursor = paginate(query, models.CourseDB.created_at, models.CourseDB.id, cursor, limit)
+    item_model = models.Course if tree else models.CourseSummary
+    return Page[item_model](
+        items=[item_model.model_validate(course, from_attributes=True) for course in courses],
+        next_cursor=next_cursor,
+        total_estimate=estimate_count(db, models.CourseDB, "courses"),
+    )
+
+def load_course_tree(course_id: int, db: Session) -> models.CourseDB:
+    course = (
+        db.query(models.CourseDB)
+        .options(COURSE_TREE)
+        .filter(models.CourseDB.id == course_id)
+        .first()
+    )
     if course is None:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
+@app.get("/courses/search", response_model=Page[models.CourseSearchHit])
+def course_search(q: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, db: Session = Depends(get_db)):
+    """
+    Full-text search over course, module and lesson titles and descriptions,
+    best match first. The last word matches as a prefix, for type-ahead.
+    """
+    rows, next_cursor = search_courses(db, q, cursor, limit)
+    items = [
+        models.CourseSearchHit(rank=rank, **models.CourseSummary.model_validate(course, from_attributes=True).dict())
+        for course, rank in rows
+    ]
+    return Page[models.CourseSearchHit](items=items, next_cursor=next_cursor)
+
+@app.get("/catalog")
+async def get_catalog(request: Request, version: Optional[int] = None):
+    """
+    All active courses with their module and lesson counts, served from a
+    snapshot that is rebuilt after every course, module or lesson write. Send the
+    version you have (?version= or If-None-Match with the ETag) to get a 304 if
+    it is still current.
+    """
+    client_version = version
+    if client_version is None:
+        etag = request.headers.get("if-none-match", "").strip().removeprefix("W/").strip('"')
+        client_version = int(etag) if etag.isdigit() else None
+    if client_version is not None and client_version == await catalog.version():
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": f'"{client_version}"'})
+    current_version, body = await catalog.get()
+    headers = {"Cache-Control": "no-cache"}
+    if current_version is not None:
+        headers.update({"ETag": f'"{current_version}"', "X-Catalog-Version": str(current_version)})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/courses/{course_id}", response_model=models.Course)
+def get_course(course_id: int, db: Session = Depends(get_db)):
+    return load_course_tree(course_id, db)
+
+@app.get("/courses/{course_id}/tree", response_model=models.Course)
+def get_course_tree(course_id: int, db: Session = Depends(get_db)):
+    """Course with its modules and lessons, in a fixed number of queries"""
+    return load_course_tree(course_id, db)
+
 # Module endpoints
 @app.post("/modules/", response_model=models.Module)
-def create_module(module: models.ModuleCreate, db: Session = Depends(get_db)):
-    db_module = models.Module(**module.dict())
+def create_module(module: models.ModuleCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    db_module = models.ModuleDB(**module.dict())
     db.add(db_module)
+    if uses_tsvector(db):
+        db.execute(append_to_course(module.course_id, MODULE_TEXT, module.title, module.description))
     db.commit()
     db.refresh(db_module)
+    background_tasks.add_task(catalog.invalidate)
     return db_module
 
 @app.get("/courses/{course_id}/modules/", response_model=List[models.Module])
 def list_course_modules(course_id: int, db: Session = Depends(get_db)):
-    modules = db.query(models.Module).filter(models.Module.course_id == course_id).all()
+    modules = (
+        db.query(models.ModuleDB)
+        .options(selectinload(models.ModuleDB.lessons))
+        .filter(models.ModuleDB.course_id == course_id)
+        .order_by(models.ModuleDB.order)
+        .all()
+    )
     return modules
 
 # Lesson endpoints
 @app.post("/lessons/", response_model=models.Lesson)
-async def create_lesson(lesson: models.LessonCreate, db: Session = Depends(get_db)):
-    # If there's content_id, verify it exists in MongoDB
+async def create_lesson(lesson: models.LessonCreate, background_tasks: BackgroundTasks,
+                        db: AsyncSession = Depends(get_async_db)):
+    # If there's content_id, verify it exists (served from the Redis cache when warm)
     if lesson.content_id:
-        content = ContentStore.get_content(lesson.content_id)
-        if not content:
+        if not await ContentStore.exists(lesson.content_id):
             raise HTTPException(status_code=404, detail="Content not found")
     
-    db_lesson = models.Lesson(**lesson.dict())
+    db_lesson = models.LessonDB(**lesson.dict())
     db.add(db_lesson)
-    db.commit()
-    db.refresh(db_lesson)
+    if uses_tsvector(db):
+        course_id = select(models.ModuleDB.course_id).where(models.ModuleDB.id == lesson.module_id).scalar_subquery()
+        await db.execute(append_to_course(course_id, LESSON_TEXT, lesson.title, lesson.description))
+    await db.commit()
+    await db.refresh(db_lesson)
+    background_tasks.add_task(catalog.invalidate)
     return db_lesson
 
 @app.get("/modules/{module_id}/lessons/", response_model=List[models.Lesson])
 def list_module_lessons(module_id: int, db: Session = Depends(get_db)):
-    lessons = db.query(models.Lesson).filter(models.Lesson.module_id == module_id).all()
+    lessons = (
+        db.query(models.LessonDB)
+        .filter(models.LessonDB.module_id == module_id)
+        .order_by(models.LessonDB.order)
+        .all()
+    )
     return lessons
 
 # Content endpoints
 @app.post("/content/")
 async def create_content(content_data: dict):
-    content_id = ContentStore.create_content(content_data)
+    content_id = await ContentStore.create_content(content_data)
     return {"content_id": content_id}
 
+@app.post("/content/media")
+async def upload_media(file: UploadFile = File(...), title: Optional[str] = Form(None)):
+    """
+    Store a video, PDF or other large file in GridFS and create a content
+    document pointing to it; the bytes are served by /content/{id}/stream.
+    """
+    content_type = file.content_type or "application/octet-stream"
+    media = await media_store.upload(file.filename or "media", content_type, file)
+    content_id = await ContentStore.create_content({
+        "type": "media",
+        "title": title or media.filename,
+        "media_id": str(media.id),
+        "filename": media.filename,
+        "content_type": media.content_type,
+        "length": media.length,
+    })
+    return {"content_id": content_id, "media_id": str(media.id), "length": media.length}
+
+@app.api_route("/content/{content_id}/stream", methods=["GET", "HEAD"])
+async def stream_content(content_id: str, request: Request):
+    """
+    Serve the media of a content document, honoring Range (206), If-Range and
+    conditional requests (304). The body is read chunk by chunk, so memory use
+    doesn't depend on the size of the file.
+    """
+    content = await ContentStore.get_content(content_id)
+    media = await media_store.get_file(content["media_id"]) if content and content.get("media_id") else None
+    if media is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": media.etag,
+        "Last-Modified": media.last_modified,
+    }
+    if media.not_modified(request.headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    try:
+        byte_range = media.byte_range(request.headers)
+    except RangeNotSatisfiable:
+        headers["Content-Range"] = f"bytes */{media.length}"
+        return Response(status_code=416, headers=headers)
+    status_code = status.HTTP_200_OK
+    start, end = 0, media.length - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{media.length}"
+    headers["Content-Length"] = str(end - start + 1)
+    if request.method == "HEAD" or media.length == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media.content_type)
+    return StreamingResponse(
+        media_store.iter_range(media, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=media.content_type,
+    )
+
 @app.get("/content/{content_id}")
 async def get_content(content_id: str):
-    content = ContentStore.get_content(content_id)
+    content = await ContentStore.get_content(content_id)
+    if not content:
+        raise HTTPException(status_code=404, detail="Content not found")
+    return content
+
+@app.put("/content/{content_id}")
+async def update_content(content_id: str, content_data: dict):
+    content = await ContentStore.update_content(content_id, content_data)
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
     return content
@@ -0,0 +1,205 @@
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from database_mongo import db
+
+# GridFS chunk size for new uploads; also the unit in which reads are cached
+MEDIA_CHUNK_SIZE = int(os.getenv("MEDIA_CHUNK_SIZE", str(1024 * 1024)))
+# In-process LRU of recently read chunks, so seeking in a video re-reads from memory
+MEDIA_CHUNK_CACHE_BYTES = int(os.getenv("MEDIA_CHUNK_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Chunks fetched per query when a read misses the cache
+MEDIA_READ_AHEAD = 4
+MEDIA_FILE_CACHE_SIZE = 1024
+
+# Files and chunks live in the media.files / media.chunks collections
+MEDIA_BUCKET = "media"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+@dataclass
+class MediaFile:
+    id: ObjectId
+    filename: str
+    content_type: str
+    length: int
+    chunk_size: int
+    upload_date: datetime
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "MediaFile":
+        metadata = doc.get("metadata") or {}
+        return cls(
+            id=doc["_id"],
+            filename=doc.get("filename") or str(doc["_id"]),
+            content_type=metadata.get("content_type") or "application/octet-stream",
+            length=doc["length"],
+            chunk_size=doc["chunkSize"],
+            upload_date=doc["uploadDate"].replace(tzinfo=timezone.utc),
+        )
+
+    @property
+    def etag(self) -> str:
+        # GridFS files are immutable, so the id identifies the bytes
+        return f'"{self.id}"'
+
+    @property
+    def last_modified(self) -> str:
+        return format_datetime(self.upload_date, usegmt=True)
+
+    def not_modified(self, headers) -> bool:
+        """Evaluate If-None-Match (preferred) or If-Modified-Since"""
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.upload_date.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def byte_range(self, headers) -> Optional[Tuple[int, int]]:
+        """
+        The (start, end) inclusive range requested with Range, or None for the whole
+        file. Multiple ranges and a stale If-Range fall back to the whole file.
+        Raises RangeNotSatisfiable if the range lies outside the file.
+        """
+        range_header = headers.get("range")
+        if not range_header:
+            return None
+        if_range = headers.get("if-range")
+        if if_range and if_range.strip() not in (self.etag, self.last_modified):
+            return None
+        match = _RANGE_RE.match(range_header.strip())
+        if not match:
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), self.length - 1) if last else self.length - 1
+        elif last:
+            # Suffix range: the final N bytes
+            start = max(0, self.length - int(last))
+            end = self.length - 1
+        else:
+            return None
+        if start >= self.length or start > end:
+            raise RangeNotSatisfiable()
+        return start, end
+
+
+class ChunkCache:
+    """LRU of GridFS chunks bounded by total bytes"""
+
+    def __init__(self, max_bytes: int = MEDIA_CHUNK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._chunks: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._chunks
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        data = self._chunks.get(key)
+        if data is None:
+            self.stats["misses"] += 1
+            return None
+        self._chunks.move_to_end(key)
+        self.stats["hits"] += 1
+        return data
+
+    def put(self, key: tuple, data: bytes):
+        if len(data) > self.max_bytes or key in self._chunks:
+            return
+        self._chunks[key] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._chunks.popitem(last=False)
+            self.bytes -= len(evicted)
+
+
+class MediaStore:
+    """Large lesson media (video, PDF...) stored in GridFS and read back by byte range"""
+
+    def __init__(self, cache_bytes: int = MEDIA_CHUNK_CACHE_BYTES):
+        self.chunks = ChunkCache(cache_bytes)
+        self._files: "OrderedDict[ObjectId, MediaFile]" = OrderedDict()
+        self._bucket = None
+
+    @property
+    def bucket(self) -> AsyncIOMotorGridFSBucket:
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(db, bucket_name=MEDIA_BUCKET)
+        return self._bucket
+
+    async def upload(self, filename: str, content_type: str, source) -> MediaFile:
+        """Copy an UploadFile into GridFS one chunk at a time"""
+        stream = self.bucket.open_upload_stream(
+            filename, chunk_size_bytes=MEDIA_CHUNK_SIZE, metadata={"content_type": content_type}
+        )
+        try:
+            while data := await source.read(MEDIA_CHUNK_SIZE):
+                await stream.write(data)
+        except BaseException:
+            await stream.abort()
+            raise
+        await stream.close()
+        return await self.get_file(stream._id)
+
+    async def get_file(self, media_id) -> Optional[MediaFile]:
+        if isinstance(media_id, str):
+            if not ObjectId.is_valid(media_id):
+                return None
+            media_id = ObjectId(media_id)
+        media = self._files.get(media_id)
+        if media is not None:
+            self._files.move_to_end(media_id)
+            return media
+        doc = await db[f"{MEDIA_BUCKET}.files"].find_one({"_id": media_id})
+        if doc is None:
+            return None
+        media = MediaFile.from_doc(doc)
+        self._files[media_id] = media
+        if len(self._files) > MEDIA_FILE_CACHE_SIZE:
+            self._files.popitem(last=False)
+        return media
+
+    async def _fetch(self, media: MediaFile, numbers: list):
+        cursor = db[f"{MEDIA_BUCKET}.chunks"].find({"files_id": media.id, "n": {"$in": numbers}}, {"n": 1, "data": 1})
+        fetched = {}
+        async for doc in cursor:
+            fetched[doc["n"]] = bytes(doc["data"])
+            self.chunks.put((media.id, doc["n"]), fetched[doc["n"]])
+        return fetched
+
+    async def iter_range(self, media: MediaFile, start: int, end: int) -> AsyncIterator[bytes]:
+        """Yield bytes start..end (inclusive), holding at most MEDIA_READ_AHEAD chunks at a time"""
+        first, last = start // media.chunk_size, end // media.chunk_size
+        pending = {}
+        for n in range(first, last + 1):
+            data = pending.pop(n, None) or self.chunks.get((media.id, n))
+            if data is None:
+                ahead = [i for i in range(n, min(last, n + MEDIA_READ_AHEAD - 1) + 1)
+                         if i == n or (media.id, i) not in self.chunks]
+                pending = await self._fetch(media, ahead)
+                data = pending.pop(n, None)
+                if data is None:
+                    raise IOError(f"Missing chunk {n} of media {media.id}")
+            offset = n * media.chunk_size
+            yield data[max(start - offset, 0):end - offset + 1]
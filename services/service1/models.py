@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, declarative_base, deferred
 from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional, List
@@ -7,9 +8,12 @@ from typing import Optional, List
 # Define la base declarativa
 Base = declarative_base()
 
-# Modelos SQLAlchemy para la base de datos
-class Course(Base):
+# Modelos SQLAlchemy para la base de datos. Llevan el sufijo DB para no quedar
+# ocultos por los modelos Pydantic del mismo nombre que se definen más abajo.
+class CourseDB(Base):
     __tablename__ = "courses"
+    # Keyset pagination of the course list (see common/helpers/pagination.py)
+    __table_args__ = (Index("ix_courses_created_at_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -18,10 +22,14 @@ class Course(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    # Full-text search over the course, its modules and lessons (see search.py).
+    # Deferred so that listings do not load it. Only filled in on PostgreSQL;
+    # elsewhere it is a plain, always empty, column.
+    search_vector = deferred(Column(TSVECTOR().with_variant(Text(), "sqlite")))
     
-    modules = relationship("Module", back_populates="course")
+    modules = relationship("ModuleDB", back_populates="course", order_by="ModuleDB.order")
 
-class Module(Base):
+class ModuleDB(Base):
     __tablename__ = "modules"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -32,10 +40,10 @@ class Module(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    course = relationship("Course", back_populates="modules")
-    lessons = relationship("Lesson", back_populates="module")
+    course = relationship("CourseDB", back_populates="modules")
+    lessons = relationship("LessonDB", back_populates="module", order_by="LessonDB.order")
 
-class Lesson(Base):
+class LessonDB(Base):
     __tablename__ = "lessons"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -47,7 +55,7 @@ class Lesson(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    module = relationship("Module", back_populates="lessons")
+    module = relationship("ModuleDB", back_populates="lessons")
 
 # Modelos Pydantic para la API
 class LessonBase(BaseModel):
@@ -94,12 +102,44 @@ class CourseBase(BaseModel):
 class CourseCreate(CourseBase):
     pass
 
-class Course(CourseBase):
+class CourseSummary(CourseBase):
     id: int
     created_at: datetime
     updated_at: datetime
     is_active: bool
-    modules: List[Module] = []
 
     class Config:
         orm_mode = True
+
+class Course(CourseSummary):
+    modules: List[Module] = []
+
+class CourseSearchHit(CourseSummary):
+    rank: float
+
+class CatalogCourse(CourseSummary):
+    module_count: int
+    lesson_count: int
+
+# Bulk import of complete course trees (POST /courses/import)
+class LessonImport(LessonBase):
+    pass
+
+class ModuleImport(ModuleBase):
+    lessons: List[LessonImport] = []
+
+class CourseImport(CourseBase):
+    modules: List[ModuleImport] = []
+
+class ModuleImportResult(BaseModel):
+    id: int
+    lesson_ids: List[int]
+
+class CourseImportResult(BaseModel):
+    id: int
+    modules: List[ModuleImportResult]
+
+class CourseImportResponse(BaseModel):
+    courses: List[CourseImportResult]
+    modules: int
+    lessons: int
@@ -0,0 +1,198 @@
+import base64
+import json
+import os
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import case, cast, exists, func, literal, literal_column, or_, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+import models
+from common.helpers.pagination import MAX_PAGE_SIZE
+
+# Text search configuration used both to build the index and to parse queries.
+# The default one is created at startup: Spanish stemming that ignores accents.
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "courses_search")
+
+# Each course has one tsvector with its own text and that of its modules and
+# lessons, weighted so that title matches rank above description, module and
+# lesson matches. The vector is extended in place when a module or lesson is
+# added, so the index never needs a full rebuild.
+COURSE_TITLE, COURSE_DESCRIPTION, MODULE_TEXT, LESSON_TEXT = "A", "B", "C", "D"
+
+MAX_QUERY_TERMS = 8
+
+
+def uses_tsvector(db) -> bool:
+    """
+    Whether the session's database keeps the tsvector index. Other databases (SQLite
+    in local runs) leave search_vector empty and search with ILIKE instead.
+    """
+    bind = db.bind
+    return bind is not None and bind.dialect.name == "postgresql"
+
+
+def text_config():
+    # Typed explicitly: asyncpg sends untyped strings as varchar, which matches no overload
+    return cast(SEARCH_TEXT_CONFIG, REGCONFIG)
+
+
+def weighted_vector(weight: str, *texts):
+    document = func.concat_ws(" ", *texts)
+    return func.setweight(func.to_tsvector(text_config(), document), literal_column(f"'{weight}'::\"char\""))
+
+
+def course_vector(title, description):
+    return weighted_vector(COURSE_TITLE, title).op("||")(weighted_vector(COURSE_DESCRIPTION, description))
+
+
+def append_to_course(course_id, weight: str, *texts):
+    """
+    UPDATE adding module or lesson text to a course's vector, to be executed in the
+    caller's transaction (with a sync or an async session) when uses_tsvector()
+    """
+    vector = models.CourseDB.search_vector
+    return (
+        update(models.CourseDB)
+        .where(models.CourseDB.id == course_id)
+        .values(search_vector=func.coalesce(vector, text("''::tsvector")).op("||")(weighted_vector(weight, *texts)))
+    )
+
+
+def _ensure_text_config(db: Session):
+    exists = db.execute(text("SELECT 1 FROM pg_ts_config WHERE cfgname = :name"), {"name": SEARCH_TEXT_CONFIG}).scalar()
+    if exists or not re.fullmatch(r"\w+", SEARCH_TEXT_CONFIG):
+        return
+    db.execute(text(f"CREATE TEXT SEARCH CONFIGURATION {SEARCH_TEXT_CONFIG} (COPY = spanish)"))
+    try:
+        with db.begin_nested():
+            db.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            db.execute(text(
+                f"ALTER TEXT SEARCH CONFIGURATION {SEARCH_TEXT_CONFIG} "
+                "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem"
+            ))
+    except DBAPIError as e:
+        print(f"Warning: unaccent is not available, search will be accent-sensitive: {e}")
+
+
+def ensure_search_index(db: Session):
+    """
+    Add the search column and its GIN index to an existing courses table and fill
+    in courses that have no vector yet (created before search existed). Idempotent.
+    """
+    if not uses_tsvector(db):
+        return
+    _ensure_text_config(db)
+    db.execute(text("ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_courses_search_vector ON courses USING GIN (search_vector)"))
+    rebuild_course_vectors(db, models.CourseDB.search_vector.is_(None))
+    db.commit()
+
+
+def rebuild_course_vectors(db: Session, *filters):
+    """Recompute the vector of the matching courses from their modules and lessons, in one UPDATE"""
+    if not uses_tsvector(db):
+        return
+    modules = (
+        select(func.string_agg(func.concat_ws(" ", models.ModuleDB.title, models.ModuleDB.description), " "))
+        .where(models.ModuleDB.course_id == models.CourseDB.id)
+        .scalar_subquery()
+    )
+    lessons = (
+        select(func.string_agg(func.concat_ws(" ", models.LessonDB.title, models.LessonDB.description), " "))
+        .join(models.ModuleDB, models.LessonDB.module_id == models.ModuleDB.id)
+        .where(models.ModuleDB.course_id == models.CourseDB.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(models.CourseDB)
+        .where(*filters)
+        .values(search_vector=course_vector(models.CourseDB.title, models.CourseDB.description)
+                .op("||")(weighted_vector(MODULE_TEXT, modules))
+                .op("||")(weighted_vector(LESSON_TEXT, lessons)))
+    )
+
+
+def query_terms(q: str) -> List[str]:
+    return re.findall(r"\w+", q.lower())[:MAX_QUERY_TERMS]
+
+
+def build_tsquery(q: str) -> Optional[str]:
+    """All words must match; the last one as a prefix, for type-ahead ("intro pyth" -> intro & pyth:*)"""
+    terms = query_terms(q)
+    if not terms:
+        return None
+    terms[-1] += ":*"
+    return " & ".join(terms)
+
+
+def _encode_cursor(rank: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, row_id]).encode()).rstrip(b"=").decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(rank), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _substring_match(terms: List[str]):
+    """
+    Fallback without a text index: every word must appear (ILIKE) in the course or
+    in one of its modules or lessons. Ranked by where the words were found, with
+    the same weights as the tsvector: title, description, module, lesson.
+    """
+    course, module, lesson = models.CourseDB, models.ModuleDB, models.LessonDB
+    rank = literal(0.0)
+    matches = []
+    for term in terms:
+        pattern = "%" + term.replace("_", "\\_") + "%"
+        in_title = course.title.ilike(pattern, escape="\\")
+        in_description = course.description.ilike(pattern, escape="\\")
+        in_module = exists().where(
+            module.course_id == course.id,
+            or_(module.title.ilike(pattern, escape="\\"), module.description.ilike(pattern, escape="\\")),
+        )
+        in_lesson = exists().where(
+            module.course_id == course.id,
+            lesson.module_id == module.id,
+            or_(lesson.title.ilike(pattern, escape="\\"), lesson.description.ilike(pattern, escape="\\")),
+        )
+        matches.append(or_(in_title, in_description, in_module, in_lesson))
+        rank = rank + case((in_title, 1.0), (in_description, 0.4), (in_module, 0.2), else_=0.1)
+    return rank, matches
+
+
+def search_courses(db: Session, q: str, cursor: Optional[str], limit: int) -> Tuple[List[tuple], Optional[str]]:
+    """
+    Courses matching `q`, best match first, as (course, rank) pairs. Pages continue
+    after the (rank, id) of the last row, like the keyset pagination of the listing.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if uses_tsvector(db):
+        tsquery = build_tsquery(q)
+        if tsquery is None:
+            return [], None
+        query_expr = func.to_tsquery(text_config(), tsquery)
+        rank = func.ts_rank_cd(models.CourseDB.search_vector, query_expr)
+        query = db.query(models.CourseDB, rank).filter(models.CourseDB.search_vector.op("@@")(query_expr))
+    else:
+        terms = query_terms(q)
+        if not terms:
+            return [], None
+        rank, matches = _substring_match(terms)
+        query = db.query(models.CourseDB, rank).filter(*matches)
+    query = query.order_by(rank.desc(), models.CourseDB.id.desc())
+    if cursor:
+        query = query.filter(tuple_(rank, models.CourseDB.id) < tuple_(*_decode_cursor(cursor)))
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    course, last_rank = rows[-1]
+    return rows, _encode_cursor(last_rank, course.id)
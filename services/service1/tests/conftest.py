@@ -0,0 +1,31 @@
+# Tests of the courses service, against a throwaway SQLite database:
+#     pip install pytest httpx && python -m pytest services/service1/tests
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+REPO_ROOT = SERVICE_DIR.parents[1]
+# The service modules import each other by name, and common/ from the repo root
+sys.path[:0] = [str(SERVICE_DIR), str(REPO_ROOT)]
+
+# database_sql reads DATABASE_URL at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/courses_test.db"
+
+
+@pytest.fixture
+def db():
+    import models
+    from database_sql import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        models.Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,21 @@
+from course_import import parse_courses
+
+
+def test_ndjson_reports_invalid_utf8_by_line():
+    body = (
+        b'{"title": "First", "instructor_id": "i"}\n'
+        b'{"title": "Bad \xff byte", "instructor_id": "i"}\n'
+        b'{"title": "Jos\xc3\xa9", "instructor_id": "i"}\n'
+    )
+
+    courses, errors = parse_courses(body, ndjson=True)
+
+    assert [course.title for course in courses] == ["First", "José"]
+    assert errors == [{"course": 2, "loc": [], "msg": "Invalid UTF-8"}]
+
+
+def test_json_with_invalid_utf8_is_an_error():
+    courses, errors = parse_courses(b'{"title": "\xff", "instructor_id": "i"}', ndjson=False)
+
+    assert courses == []
+    assert errors[0]["msg"].startswith("Invalid JSON")
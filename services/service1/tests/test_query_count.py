@@ -0,0 +1,74 @@
+"""
+The course listings and the course tree must cost a fixed number of queries
+however many courses, modules and lessons there are (no N+1 on serialization).
+"""
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import models
+from database_sql import engine
+from main import app
+
+# Without `with`, TestClient does not run the startup handlers (Mongo, Redis)
+client = TestClient(app)
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed(db, courses: int, modules: int, lessons: int) -> int:
+    for c in range(courses):
+        course = models.CourseDB(title=f"Course {c}", instructor_id="instructor")
+        for m in range(modules):
+            module = models.ModuleDB(title=f"Module {c}.{m}", order=m)
+            module.lessons = [models.LessonDB(title=f"Lesson {c}.{m}.{l}", order=l) for l in range(lessons)]
+            course.modules.append(module)
+        db.add(course)
+    db.commit()
+    return db.query(models.CourseDB.id).order_by(models.CourseDB.id).first()[0]
+
+
+def queries_for(path: str, **params) -> int:
+    # The first request warms the cached total of the paged listing
+    assert client.get(path, params=params).status_code == 200
+    with count_queries() as statements:
+        response = client.get(path, params=params)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize("courses, modules, lessons", [(1, 1, 1), (5, 4, 3)])
+def test_course_listings_use_a_fixed_number_of_queries(db, courses, modules, lessons):
+    course_id = seed(db, courses, modules, lessons)
+
+    assert queries_for("/courses/", page="true") == 1
+    assert queries_for("/courses/", page="true", tree="true") == 3
+    assert queries_for(f"/courses/{course_id}/tree") == 3
+    # The original listing always includes the modules and lessons
+    assert queries_for("/courses/") == 3
+
+
+def test_course_tree_is_complete(db):
+    course_id = seed(db, 2, 4, 3)
+
+    tree = client.get(f"/courses/{course_id}/tree").json()
+    assert [module["order"] for module in tree["modules"]] == [0, 1, 2, 3]
+    assert all(len(module["lessons"]) == 3 for module in tree["modules"])
+
+    listing = client.get("/courses/", params={"page": "true", "tree": "true"}).json()
+    assert len(listing["items"]) == 2
+    assert sum(len(module["lessons"]) for course in listing["items"] for module in course["modules"]) == 24
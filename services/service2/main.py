@@ -1,12 +1,14 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 from datetime import datetime
 import sys
 sys.path.insert(0, '/app')
 
 import models
 from database_sql import get_db, create_db_and_tables
+from common.helpers.identity import current_user_id
+from common.helpers.pagination import DEFAULT_PAGE_SIZE, Page, estimate_count, paginate
 
 app = FastAPI(title="Progress Tracking Service")
 
@@ -29,25 +31,46 @@ def create_course_progress(
     progress: models.StudentProgressCreate,
     db: Session = Depends(get_db)
 ):
-    db_progress = models.StudentProgress(**progress.dict())
+    db_progress = models.StudentProgressDB(**progress.dict())
     db.add(db_progress)
     db.commit()
     db.refresh(db_progress)
     return db_progress
 
-@app.get("/progress/student/{student_id}/courses/", response_model=List[models.StudentProgress])
-def get_student_progress(student_id: str, db: Session = Depends(get_db)):
-    progress = db.query(models.StudentProgress)\
-        .filter(models.StudentProgress.student_id == student_id)\
-        .all()
-    return progress
+def list_student_progress(db: Session, student_id: str, cursor: Optional[str], limit: int, page: bool):
+    """All of the student's progress; a Page of `limit` rows when a cursor or page=true is passed"""
+    student_filter = models.StudentProgressDB.student_id == student_id
+    query = db.query(models.StudentProgressDB).filter(student_filter)
+    if cursor is None and not page:
+        return query.all()
+    progress, next_cursor = paginate(
+        query, models.StudentProgressDB.created_at, models.StudentProgressDB.id, cursor, limit
+    )
+    return {
+        "items": progress,
+        "next_cursor": next_cursor,
+        "total_estimate": estimate_count(db, models.StudentProgressDB, f"student:{student_id}", student_filter),
+    }
+
+ProgressList = Union[List[models.StudentProgress], Page[models.StudentProgress]]
+
+@app.get("/progress/student/{student_id}/courses/", response_model=ProgressList)
+def get_student_progress(student_id: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                         page: bool = False, db: Session = Depends(get_db)):
+    return list_student_progress(db, student_id, cursor, limit, page)
+
+@app.get("/progress/me/courses/", response_model=ProgressList)
+def get_my_progress(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, page: bool = False,
+                    student_id: str = Depends(current_user_id), db: Session = Depends(get_db)):
+    """Progress of the authenticated student, identified by the gateway"""
+    return list_student_progress(db, student_id, cursor, limit, page)
 
 @app.get("/progress/course/{course_id}/student/{student_id}", response_model=models.StudentProgress)
 def get_course_progress(course_id: int, student_id: str, db: Session = Depends(get_db)):
-    progress = db.query(models.StudentProgress)\
+    progress = db.query(models.StudentProgressDB)\
         .filter(
-            models.StudentProgress.course_id == course_id,
-            models.StudentProgress.student_id == student_id
+            models.StudentProgressDB.course_id == course_id,
+            models.StudentProgressDB.student_id == student_id
         ).first()
     if not progress:
         raise HTTPException(status_code=404, detail="Progress not found")
@@ -60,10 +83,10 @@ def create_lesson_progress(
     db: Session = Depends(get_db)
 ):
     # Create or update lesson progress
-    db_progress = db.query(models.LessonProgress)\
+    db_progress = db.query(models.LessonProgressDB)\
         .filter(
-            models.LessonProgress.student_id == progress.student_id,
-            models.LessonProgress.lesson_id == progress.lesson_id
+            models.LessonProgressDB.student_id == progress.student_id,
+            models.LessonProgressDB.lesson_id == progress.lesson_id
         ).first()
     
     if db_progress:
@@ -76,10 +99,10 @@ def create_lesson_progress(
             db_progress.completed_at = datetime.utcnow()
             
             # Update course progress
-            course_progress = db.query(models.StudentProgress)\
+            course_progress = db.query(models.StudentProgressDB)\
                 .filter(
-                    models.StudentProgress.course_id == progress.course_id,
-                    models.StudentProgress.student_id == progress.student_id
+                    models.StudentProgressDB.course_id == progress.course_id,
+                    models.StudentProgressDB.student_id == progress.student_id
                 ).first()
             if course_progress:
                 course_progress.completed_lessons += 1
@@ -89,7 +112,7 @@ def create_lesson_progress(
                 course_progress.last_accessed = datetime.utcnow()
     else:
         # Create new progress
-        db_progress = models.LessonProgress(**progress.dict())
+        db_progress = models.LessonProgressDB(**progress.dict())
         if progress.status == "completed":
             db_progress.completed_at = datetime.utcnow()
         db.add(db_progress)
@@ -100,10 +123,10 @@ def create_lesson_progress(
 
 @app.get("/progress/lesson/{lesson_id}/student/{student_id}", response_model=models.LessonProgress)
 def get_lesson_progress(lesson_id: int, student_id: str, db: Session = Depends(get_db)):
-    progress = db.query(models.LessonProgress)\
+    progress = db.query(models.LessonProgressDB)\
         .filter(
-            models.LessonProgress.lesson_id == lesson_id,
-            models.LessonProgress.student_id == student_id
+            models.LessonProgressDB.lesson_id == lesson_id,
+            models.LessonProgressDB.student_id == student_id
         ).first()
     if not progress:
         raise HTTPException(status_code=404, detail="Progress not found")
@@ -111,9 +134,9 @@ def get_lesson_progress(lesson_id: int, student_id: str, db: Session = Depends(g
 
 @app.get("/progress/module/{module_id}/student/{student_id}", response_model=List[models.LessonProgress])
 def get_module_progress(module_id: int, student_id: str, db: Session = Depends(get_db)):
-    progress = db.query(models.LessonProgress)\
+    progress = db.query(models.LessonProgressDB)\
         .filter(
-            models.LessonProgress.module_id == module_id,
-            models.LessonProgress.student_id == student_id
+            models.LessonProgressDB.module_id == module_id,
+            models.LessonProgressDB.student_id == student_id
         ).all()
     return progress
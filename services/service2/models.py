@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 from pydantic import BaseModel
@@ -7,8 +7,11 @@ from typing import Optional, List
 # Define la base declarativa
 Base = declarative_base()
 
-class StudentProgress(Base):
+# SQLAlchemy models carry a DB suffix so the Pydantic models below do not shadow them
+class StudentProgressDB(Base):
     __tablename__ = "student_progress"
+    # Keyset pagination of a student's courses (see common/helpers/pagination.py)
+    __table_args__ = (Index("ix_student_progress_student_created_id", "student_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(String, index=True)  # MongoDB ID from auth service
@@ -20,7 +23,7 @@ class StudentProgress(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
-class LessonProgress(Base):
+class LessonProgressDB(Base):
     __tablename__ = "lesson_progress"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -1,16 +1,23 @@
 from fastapi import FastAPI, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 from datetime import datetime
 import sys
 sys.path.insert(0, '/app')
 
 import models
-from database_sql import get_db, create_db_and_tables
-import requests
+from database_sql import async_engine, get_async_db, get_db, create_db_and_tables
+from common.helpers.identity import current_user_id
+from common.helpers.pagination import DEFAULT_PAGE_SIZE, Page, estimate_count, paginate
+import httpx
 import os
 
+PROGRESS_SERVICE_URL = os.getenv("PROGRESS_SERVICE_URL", "http://service2-service:8003")
+
 app = FastAPI(title="Evaluations Service")
+# Shared client for calls to the progress service (keeps connections alive)
+http_client = httpx.AsyncClient(timeout=5.0)
 
 # Create tables on startup
 @app.on_event("startup")
@@ -20,6 +27,11 @@ async def startup_event():
     except Exception as e:
         print(f"Warning: could not create DB tables at startup: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await http_client.aclose()
+    await async_engine.dispose()
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
@@ -28,7 +40,7 @@ def health_check():
 # Quiz endpoints
 @app.post("/quizzes/", response_model=models.Quiz)
 def create_quiz(quiz: models.QuizCreate, db: Session = Depends(get_db)):
-    db_quiz = models.Quiz(**quiz.dict())
+    db_quiz = models.QuizDB(**quiz.dict())
     db.add(db_quiz)
     db.commit()
     db.refresh(db_quiz)
@@ -36,15 +48,15 @@ def create_quiz(quiz: models.QuizCreate, db: Session = Depends(get_db)):
 
 @app.get("/quizzes/{quiz_id}", response_model=models.Quiz)
 def get_quiz(quiz_id: int, db: Session = Depends(get_db)):
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+    quiz = db.query(models.QuizDB).filter(models.QuizDB.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     return quiz
 
 @app.get("/lessons/{lesson_id}/quizzes/", response_model=List[models.Quiz])
 def get_lesson_quizzes(lesson_id: int, db: Session = Depends(get_db)):
-    quizzes = db.query(models.Quiz)\
-        .filter(models.Quiz.lesson_id == lesson_id)\
+    quizzes = db.query(models.QuizDB)\
+        .filter(models.QuizDB.lesson_id == lesson_id)\
         .all()
     return quizzes
 
@@ -52,10 +64,15 @@ def get_lesson_quizzes(lesson_id: int, db: Session = Depends(get_db)):
 @app.post("/quiz-attempts/", response_model=models.QuizAttempt)
 async def submit_quiz(
     submission: models.AnswerSubmission,
-    db: Session = Depends(get_db)
+    student_id: str = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # The attempt belongs to the authenticated student; student_id in the body is optional
+    if submission.student_id is not None and submission.student_id != student_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot submit a quiz for another student")
+
     # Get the quiz
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == submission.quiz_id).first()
+    quiz = await db.get(models.QuizDB, submission.quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
@@ -71,9 +88,9 @@ async def submit_quiz(
     passed = score >= quiz.passing_score
     
     # Create quiz attempt record
-    db_attempt = models.QuizAttempt(
+    db_attempt = models.QuizAttemptDB(
         quiz_id=submission.quiz_id,
-        student_id=submission.student_id,
+        student_id=student_id,
         answers=submission.answers,
         score=score,
         passed=passed,
@@ -81,17 +98,16 @@ async def submit_quiz(
     )
     
     db.add(db_attempt)
-    db.commit()
-    db.refresh(db_attempt)
+    await db.commit()
+    await db.refresh(db_attempt)
     
     # Update progress service if quiz was passed
     if passed:
         try:
-            progress_service_url = os.getenv("PROGRESS_SERVICE_URL", "http://service2-service:8003")
-            requests.post(
-                f"{progress_service_url}/progress/lesson/",
+            await http_client.post(
+                f"{PROGRESS_SERVICE_URL}/progress/lesson/",
                 json={
-                    "student_id": submission.student_id,
+                    "student_id": student_id,
                     "lesson_id": quiz.lesson_id,
                     "course_id": quiz.course_id,
                     "status": "completed"
@@ -104,21 +120,38 @@ async def submit_quiz(
 
 @app.get("/quiz-attempts/{attempt_id}", response_model=models.QuizAttempt)
 def get_quiz_attempt(attempt_id: int, db: Session = Depends(get_db)):
-    attempt = db.query(models.QuizAttempt).filter(models.QuizAttempt.id == attempt_id).first()
+    attempt = db.query(models.QuizAttemptDB).filter(models.QuizAttemptDB.id == attempt_id).first()
     if not attempt:
         raise HTTPException(status_code=404, detail="Quiz attempt not found")
     return attempt
 
-@app.get("/students/{student_id}/quiz-attempts/", response_model=List[models.QuizAttempt])
-def get_student_attempts(student_id: str, db: Session = Depends(get_db)):
-    attempts = db.query(models.QuizAttempt)\
-        .filter(models.QuizAttempt.student_id == student_id)\
-        .all()
-    return attempts
+def list_attempts(db: Session, count_key: str, attempt_filter, cursor: Optional[str], limit: int, page: bool):
+    """
+    All matching attempts, or with a cursor or page=true a Page of the most recent
+    ones first, paginated on (started_at, id)
+    """
+    query = db.query(models.QuizAttemptDB).filter(attempt_filter)
+    if cursor is None and not page:
+        return query.all()
+    attempts, next_cursor = paginate(
+        query, models.QuizAttemptDB.started_at, models.QuizAttemptDB.id, cursor, limit, descending=True
+    )
+    return {
+        "items": attempts,
+        "next_cursor": next_cursor,
+        "total_estimate": estimate_count(db, models.QuizAttemptDB, count_key, attempt_filter),
+    }
 
-@app.get("/quizzes/{quiz_id}/attempts/", response_model=List[models.QuizAttempt])
-def get_quiz_attempts(quiz_id: int, db: Session = Depends(get_db)):
-    attempts = db.query(models.QuizAttempt)\
-        .filter(models.QuizAttempt.quiz_id == quiz_id)\
-        .all()
-    return attempts
+AttemptList = Union[List[models.QuizAttempt], Page[models.QuizAttempt]]
+
+@app.get("/students/{student_id}/quiz-attempts/", response_model=AttemptList)
+def get_student_attempts(student_id: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                         page: bool = False, db: Session = Depends(get_db)):
+    return list_attempts(
+        db, f"student:{student_id}", models.QuizAttemptDB.student_id == student_id, cursor, limit, page
+    )
+
+@app.get("/quizzes/{quiz_id}/attempts/", response_model=AttemptList)
+def get_quiz_attempts(quiz_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                      page: bool = False, db: Session = Depends(get_db)):
+    return list_attempts(db, f"quiz:{quiz_id}", models.QuizAttemptDB.quiz_id == quiz_id, cursor, limit, page)
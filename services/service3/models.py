@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, JSON, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 from typing import Optional, List, Dict, Any
@@ -6,7 +6,8 @@ from pydantic import BaseModel, Field
 
 Base = declarative_base()
 
-class Quiz(Base):
+# SQLAlchemy models carry a DB suffix so the Pydantic models below do not shadow them
+class QuizDB(Base):
     __tablename__ = "quizzes"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -20,8 +21,13 @@ class Quiz(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
-class QuizAttempt(Base):
+class QuizAttemptDB(Base):
     __tablename__ = "quiz_attempts"
+    # Keyset pagination of attempts per student and per quiz (see common/helpers/pagination.py)
+    __table_args__ = (
+        Index("ix_quiz_attempts_student_started_id", "student_id", "started_at", "id"),
+        Index("ix_quiz_attempts_quiz_started_id", "quiz_id", "started_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
@@ -32,7 +38,7 @@ class QuizAttempt(Base):
     started_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     
-    quiz = relationship("Quiz")
+    quiz = relationship("QuizDB")
 
 # Pydantic models for API
 class QuestionBase(BaseModel):
@@ -62,7 +68,8 @@ class Quiz(QuizBase):
 
 class AnswerSubmission(BaseModel):
     quiz_id: int
-    student_id: str
+    # Taken from the authenticated user; if sent, it must be that user
+    student_id: Optional[str] = None
     answers: Dict[str, int]  # Question number -> Selected option number
 
 class QuizAttemptBase(BaseModel):